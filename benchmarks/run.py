@@ -0,0 +1,150 @@
+# Usage: python3 benchmarks/run.py [--scales 200,2000] [--stages ...] [--out benchmarks/results.json]
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from time import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic import generate_corpus
+
+# (stage, command), in pipeline order. Scripts run from the working directory.
+STAGES = [
+    ('load_corpus', ['benchmarks/stages.py', 'load_corpus']),
+    ('comment2edges', ['comment2edges.py']),
+    ('comment2nodes', ['comment2nodes.py']),
+    ('multigraph', ['benchmarks/stages.py', 'multigraph']),
+    ('graph', ['benchmarks/stages.py', 'graph']),
+    ('corpus_stats', ['benchmarks/stages.py', 'corpus_stats']),
+    ('signed_extraction', ['signed_network_extraction.py']),
+    ('triads', ['benchmarks/stages.py', 'triads']),
+]
+OUT_DIRS = ['data/network/edges', 'data/network/nodes', 'data/signed_network']
+
+
+def run_stage(cmd, cwd):
+    """Run a command, returning its wall time, peak memory and output
+
+    Peak memory is the maximum resident set size of the process, from
+    ``os.wait4``.
+    """
+
+    s = time()
+    p = subprocess.Popen([sys.executable] + cmd, cwd=cwd, stdout=subprocess.PIPE, env=dict(os.environ, PYTHONPATH=REPO_DIR))
+    out = p.stdout.read()
+    _, status, rusage = os.wait4(p.pid, 0)
+    secs = time() - s
+    p.stdout.close()
+    p.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    if p.returncode != 0:
+        raise Exception(f"`{' '.join(cmd)}` failed with exit code {p.returncode}")
+
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = rusage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return secs, peak, out.decode('utf-8')
+
+
+def setup_workdir(workdir, board, years, posts_per_year, seed):
+    """Generate a corpus and link the pipeline scripts into a working directory"""
+
+    corpus = generate_corpus(os.path.join(workdir, 'data/corpus/'), board, years, posts_per_year, seed=seed)
+    for d in OUT_DIRS:
+        os.makedirs(os.path.join(workdir, d), exist_ok=True)
+    os.symlink(BENCH_DIR, os.path.join(workdir, 'benchmarks'))
+    for script in ['comment2edges.py', 'comment2nodes.py', 'signed_network_extraction.py']:
+        os.symlink(os.path.join(REPO_DIR, script), os.path.join(workdir, script))
+    return corpus
+
+
+def benchmark(scale, board='Gossiping', years=('2015',), stages=None, seed=0, workdir=None):
+    """Time the pipeline stages on a synthetic corpus of ``scale`` posts per year
+
+    Returns
+    -------
+    list
+        One record per stage, with wall time (``secs``), peak resident
+        memory (``peak_rss``, bytes), items processed and throughput
+        (items per second).
+    """
+
+    tmp = workdir is None
+    workdir = tempfile.mkdtemp(prefix='pttnet-bench-') if tmp else workdir
+    try:
+        corpus = setup_workdir(workdir, board, years, scale, seed)
+        records = []
+        for name, cmd in STAGES:
+            if stages is not None and name not in stages: continue
+            secs, peak, out = run_stage(cmd + [board, ','.join(years)], workdir)
+
+            # Scripts print nothing; count their throughput in posts
+            record = json.loads(out) if out.strip() else {'items': corpus['posts'], 'unit': 'posts'}
+            record.update({
+                'stage': name,
+                'scale': scale,
+                'secs': secs,
+                'peak_rss': peak,
+                'throughput': record['items'] / secs if secs > 0 else None,
+            })
+            records.append(record)
+            print(f"{scale:>8} {name:<18} {secs:8.2f} s {peak / 1024**2:8.1f} MiB {record['items']:>10} {record['unit']}")
+        return corpus, records
+    finally:
+        if tmp:
+            shutil.rmtree(workdir)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+#%%
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the network construction pipeline on synthetic corpora")
+    parser.add_argument('--scales', default='200,2000', help="Posts per year, comma separated")
+    parser.add_argument('--board', default='Gossiping')
+    parser.add_argument('--years', default='2015', help="Comma separated")
+    parser.add_argument('--stages', default=None, help=f"Comma separated subset of: {','.join(s for s, _ in STAGES)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=os.path.join(BENCH_DIR, 'results.json'), help="Results are appended to this file")
+    args = parser.parse_args()
+
+    stages = None if args.stages is None else args.stages.split(',')
+    years = args.years.split(',')
+
+    # Baseline: peak memory of an empty interpreter
+    _, baseline, _ = run_stage(['-c', 'pass'], REPO_DIR)
+
+    run = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'board': args.board,
+        'years': years,
+        'seed': args.seed,
+        'baseline_peak_rss': baseline,
+        'scales': [],
+    }
+    for scale in [int(s) for s in args.scales.split(',')]:
+        corpus, records = benchmark(scale, args.board, years, stages, args.seed)
+        run['scales'].append({'posts_per_year': scale, 'corpus': corpus, 'stages': records})
+
+    # Keep previous runs, so that regressions show up
+    results = []
+    if os.path.exists(args.out):
+        with open(args.out) as f:
+            results = json.load(f)
+    results.append(run)
+    with open(args.out, 'w') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
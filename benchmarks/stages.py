@@ -0,0 +1,69 @@
+# Usage: python3 benchmarks/stages.py <stage> <board_name> <year1,year2,...>
+# Run from a benchmark working directory (see benchmarks/run.py); prints counts as JSON
+import os
+import sys
+import json
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from pttnet import preprocess
+from pttnet.graph import MultiGraph, Graph, Node
+from pttnet.features import node_ids
+from pttnet.signed_network.triangles import Triangles
+
+BASE_DIR = 'data/corpus/'
+NODE_DIR = 'data/network/nodes'
+EDGE_DIR = 'data/network/edges'
+SIGNED_DIR = 'data/signed_network/'
+
+
+def load_corpus(board, years):
+    posts = preprocess.load_comments_data_from_corpus(boards=[board], years=years, basedir=BASE_DIR)
+    return {'items': len(posts), 'unit': 'posts', 'comments': sum(len(p['comments']) for p in posts)}
+
+
+def multigraph(board, years):
+    MG = MultiGraph(boards=[board], years=years, node_path=NODE_DIR, edge_path=EDGE_DIR)
+    return {'items': MG.number_of_edges(), 'unit': 'edges', 'nodes': MG.number_of_nodes()}
+
+
+def graph(board, years):
+    s = time()
+    MG = MultiGraph(boards=[board], years=years, node_path=NODE_DIR, edge_path=EDGE_DIR)
+    load_secs = time() - s
+    s = time()
+    G = Graph(count_edges_in={'opinion': ['pos-pos', 'neg-neg']}, MG=MG)
+    return {
+        'items': MG.number_of_edges(), 'unit': 'edges',
+        'load_secs': load_secs, 'collapse_secs': time() - s, 'graph_edges': G.number_of_edges()
+    }
+
+
+def corpus_stats(board, years):
+    n_comments = 0
+    ids = node_ids(NODE_DIR)
+    for id_ in ids:
+        stats, _ = Node(id_, from_disk=NODE_DIR).getCorpusStats(boards={board})
+        n_comments += stats['count-all']
+    return {'items': len(ids), 'unit': 'nodes', 'comments': n_comments}
+
+
+def triads(board, years):
+    T = Triangles(board=board, years=years, data_dir=SIGNED_DIR)
+    return {'items': T.count(), 'unit': 'triads'}
+
+
+STAGES = {
+    'load_corpus': load_corpus,
+    'multigraph': multigraph,
+    'graph': graph,
+    'corpus_stats': corpus_stats,
+    'triads': triads,
+}
+
+
+#%%
+if __name__ == "__main__":
+    out = STAGES[sys.argv[1]](sys.argv[2], sys.argv[3].split(','))
+    print(json.dumps(out))
@@ -0,0 +1,114 @@
+# Usage: python3 benchmarks/synthetic.py <out_dir> <board_name> <year1,year2,...> <posts_per_year> [seed]
+import os
+import sys
+import json
+import random
+import itertools
+from datetime import datetime, timedelta
+
+TAGS = ['問卦', '新聞', '爆卦', '心情', '討論', None]
+TYPES = ['pos', 'neu', 'neg']
+TYPE_WEIGHTS = [0.5, 0.35, 0.15]
+
+
+def zipf_weights(n, alpha=1.1):
+    """Cumulative Zipf weights of ``n`` ranks, for ``random.choices``"""
+    return list(itertools.accumulate(1 / (r + 1)**alpha for r in range(n)))
+
+
+def generate_corpus(basedir='data/corpus/', board='Gossiping', years=(2015,), posts_per_year=1000, n_authors=None,
+                    mean_comments=20, vocab_size=5000, seed=0):
+    """Write a deterministic synthetic PTT corpus
+
+    Posts are saved in the layout and format read by
+    :py:func:`pttnet.preprocess.load_comments_data_from_corpus`
+    (``<basedir>/<board>/<year>/<post_id>.json``). Authors and words are
+    drawn from Zipf distributions, so a few authors write most comments,
+    and the number of comments per post is log-normal.
+
+    Parameters
+    ----------
+    basedir : str, optional
+        Corpus directory, by default 'data/corpus/'
+    board : str, optional
+        Board name, by default 'Gossiping'
+    years : tuple, optional
+        Years of the posts, by default (2015,)
+    posts_per_year : int, optional
+        Number of posts per year, by default 1000
+    n_authors : int, optional
+        Number of distinct authors, by default ``posts_per_year // 2 + 10``
+    mean_comments : int, optional
+        Mean number of comments per post, by default 20
+    vocab_size : int, optional
+        Number of distinct words, by default 5000
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    dict
+        Number of ``posts``, ``comments`` and ``authors`` written.
+    """
+
+    rng = random.Random(seed)
+    n_authors = n_authors or posts_per_year // 2 + 10
+    authors = [f"u{i}" for i in range(n_authors)]
+    author_weights = zipf_weights(n_authors)
+    words = [f"w{i}" for i in range(vocab_size)]
+    word_weights = zipf_weights(vocab_size)
+
+    def text(n_words):
+        return '　'.join(rng.choices(words, cum_weights=word_weights, k=n_words))
+
+    stats = {'posts': 0, 'comments': 0, 'authors': set()}
+    for year in years:
+        out_dir = os.path.join(basedir, board, str(year))
+        os.makedirs(out_dir, exist_ok=True)
+        first = datetime(int(year), 1, 1)
+        secs = (datetime(int(year) + 1, 1, 1) - first).total_seconds()
+
+        for i in range(posts_per_year):
+            time = first + timedelta(seconds=int(rng.random() * secs))
+            tag = rng.choice(TAGS)
+            title = ('Re: ' if rng.random() < 0.3 else '') + (f'[{tag}] ' if tag else '') + text(3).replace('　', '')
+
+            n_comments = min(int(rng.lognormvariate(0, 1) * mean_comments / 1.65), 50 * mean_comments)
+            comments = [
+                {
+                    'author': a,
+                    'type': t,
+                    'content': text(rng.randint(1, 12)),
+                    'order': j,
+                }
+                for j, (a, t) in enumerate(zip(
+                    rng.choices(authors, cum_weights=author_weights, k=n_comments),
+                    rng.choices(TYPES, weights=TYPE_WEIGHTS, k=n_comments)
+                ))
+            ]
+            post = {
+                'post_title': title,
+                'post_time': int(time.timestamp()),
+                'post_author': rng.choices(authors, cum_weights=author_weights)[0],
+                'comments': comments,
+                'post_body': text(rng.randint(20, 200)),
+            }
+
+            post_id = f"{time:%Y%m%d}_{i:04d}_M.{int(time.timestamp())}.A.json"
+            with open(os.path.join(out_dir, post_id), 'w') as f:
+                json.dump(post, f, ensure_ascii=False)
+
+            stats['posts'] += 1
+            stats['comments'] += n_comments
+            stats['authors'].update(c['author'] for c in comments)
+            stats['authors'].add(post['post_author'])
+
+    stats['authors'] = len(stats['authors'])
+    return stats
+
+
+#%%
+if __name__ == "__main__":
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    stats = generate_corpus(os.path.join(sys.argv[1], ''), sys.argv[2], sys.argv[3].split(','), int(sys.argv[4]), seed=seed)
+    print(json.dumps(stats))
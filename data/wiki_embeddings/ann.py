@@ -0,0 +1,164 @@
+#%%
+from time import time
+import numpy as np
+
+
+class IVFIndex():
+
+    def __init__(self, centroids, order, offsets):
+        """Inverted-file (IVF) index for approximate cosine nearest neighbors
+
+        Word vectors are clustered by (spherical) k-means. A query is only
+        compared with the words in the ``nprobe`` clusters whose centroids
+        are closest to it. Use :py:meth:`.build` or :py:meth:`.load` to
+        create an index.
+
+        Parameters
+        ----------
+        centroids : np.ndarray
+            Unit-length cluster centroids, shape ``(n_lists, dim)``.
+        order : np.ndarray
+            Word indices grouped by cluster.
+        offsets : np.ndarray
+            Words of cluster ``c`` are ``order[offsets[c]:offsets[c + 1]]``.
+        """
+
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+
+    def __repr__(self):
+        return f"<IVFIndex, lists: {len(self.centroids)}, words: {len(self.order)}>"
+
+
+    @classmethod
+    def build(cls, wordvec, n_lists=1024, n_iter=10, sample=100000, seed=0, chunk=1 << 15):
+        """Cluster unit-length word vectors with k-means
+
+        Parameters
+        ----------
+        wordvec : np.ndarray
+            Normalized word vectors (may be memory-mapped).
+        n_lists : int, optional
+            Number of clusters, by default 1024
+        n_iter : int, optional
+            k-means iterations, by default 10
+        sample : int, optional
+            Number of vectors k-means is trained on, by default 100000
+        seed : int, optional
+            Random seed, by default 0
+        chunk : int, optional
+            Number of vectors assigned at once, by default 1 << 15
+        """
+
+        rng = np.random.default_rng(seed)
+        n = len(wordvec)
+        train = np.asarray(wordvec[np.sort(rng.choice(n, min(sample, n), replace=False))], dtype=np.float32)
+        centroids = train[rng.choice(len(train), min(n_lists, len(train)), replace=False)]
+
+        # Spherical k-means: assign by cosine, re-normalize means
+        for _ in range(n_iter):
+            labels = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, train)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            centroids = np.where(empty[:, None], centroids, sums / np.where(empty, 1, norms[:, 0])[:, None])
+
+        # Assign all words
+        labels = np.empty(n, dtype=np.int32)
+        for i in range(0, n, chunk):
+            labels[i:i + chunk] = np.argmax(np.asarray(wordvec[i:i + chunk], dtype=np.float32) @ centroids.T, axis=1)
+        order = np.argsort(labels, kind='stable').astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=len(centroids)), out=offsets[1:])
+
+        return cls(centroids, order, offsets)
+
+
+    def save(self, path="wiki_zh-ivf.npz"):
+        np.savez(path, centroids=self.centroids, order=self.order, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path="wiki_zh-ivf.npz"):
+        data = np.load(path)
+        return cls(data['centroids'], data['order'], data['offsets'])
+
+
+    def search(self, wordvec, vecs, top_n=10, nprobe=16, exclude=None):
+        """Approximate nearest neighbors of query vectors
+
+        Parameters
+        ----------
+        wordvec : np.ndarray
+            Word vectors the index was built from.
+        vecs : np.ndarray
+            Query vectors, shape ``(k, dim)``.
+        top_n : int, optional
+            Number of neighbors, by default 10
+        nprobe : int, optional
+            Number of clusters searched per query, by default 16
+        exclude : list, optional
+            Word index to leave out for each query (e.g., the query word
+            itself), by default None
+
+        Returns
+        -------
+        list
+            ``(indices, similarities)`` arrays in descending order, for
+            each query.
+        """
+
+        vecs = np.asarray(vecs, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(vecs @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        out = []
+        for j, (q, lists) in enumerate(zip(vecs, probes)):
+            cands = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+            if exclude is not None:
+                cands = cands[cands != exclude[j]]
+            cands.sort()   # Read memory-mapped rows in file order
+            scores = np.asarray(wordvec[cands], dtype=np.float32) @ q
+            k = min(top_n, len(cands))
+            top = np.argpartition(-scores, k - 1)[:k] if k > 0 else np.array([], dtype=np.int64)
+            top = top[np.argsort(-scores[top])]
+            out.append((cands[top], scores[top]))
+        return out
+
+
+    def recall(self, wordvec, n_queries=100, top_n=10, nprobe=16, seed=0):
+        """Recall of the index against exact search, on random query words
+
+        Returns
+        -------
+        dict
+            Mean ``recall`` (fraction of the exact ``top_n`` neighbors
+            found) and the seconds per query of exact and approximate
+            search.
+        """
+
+        rng = np.random.default_rng(seed)
+        queries = rng.choice(len(wordvec), n_queries, replace=False)
+        vecs = np.asarray(wordvec[queries], dtype=np.float32)
+
+        s = time()
+        exact = []
+        for i in range(0, len(wordvec), 1 << 16):
+            exact.append(np.asarray(wordvec[i:i + (1 << 16)], dtype=np.float32) @ vecs.T)
+        exact = np.concatenate(exact)
+        exact[queries, np.arange(n_queries)] = -np.inf
+        exact = np.argpartition(-exact, top_n - 1, axis=0)[:top_n].T
+        t_exact = time() - s
+
+        s = time()
+        approx = self.search(wordvec, vecs, top_n, nprobe, exclude=queries)
+        t_approx = time() - s
+
+        hits = [len(set(e.tolist()) & set(a.tolist())) for e, (a, _) in zip(exact, approx)]
+        return {
+            'recall': sum(hits) / (top_n * n_queries),
+            'nprobe': nprobe,
+            'exact_secs_per_query': t_exact / n_queries,
+            'approx_secs_per_query': t_approx / n_queries,
+        }
@@ -1,32 +1,123 @@
 #%%
+import os
 import pickle
 import numpy as np
 
+try:
+    from .ann import IVFIndex
+except ImportError:     # Run as a script, from this directory
+    from ann import IVFIndex
+
+# The converted embeddings are next to this file
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Embeddings():
     
-    def __init__(self):
+    def __init__(self, mmap_mode='r', data_dir=DATA_DIR):
+        """Word embeddings converted by ``wiki_wordvec.py``
+
+        Parameters
+        ----------
+        mmap_mode : str, optional
+            Passed to ``np.load``. The default 'r' memory-maps the vectors,
+            so only the rows used are read from disk. Use None to load
+            the whole matrix into memory.
+        data_dir : str, optional
+            Directory of the converted embeddings, by default the 
+            directory of this file.
+        """
+
+        self.data_dir = data_dir
         self.vocab = None
-        self.wi = None
         self.wordvec = None
-        self._load()
+        self._wi = None
+        self._order = None
+        self.index = None
+        self._load(mmap_mode)
 
-    def _load(self):
+    def _load(self, mmap_mode='r'):
         # Load vocabulary
-        with open(f"wiki_zh-vocab.pkl", "rb") as f:
-            self.vocab = pickle.load(f)
+        if os.path.exists(self._path("wiki_zh-vocab.txt")):
+            with open(self._path("wiki_zh-vocab.txt")) as f:
+                self.vocab = f.read().split('\n')[:-1]
+            self._order = np.load(self._path("wiki_zh-vocab-order.npy"))
+        else:
+            with open(self._path("wiki_zh-vocab.pkl"), "rb") as f:
+                self.vocab = pickle.load(f)
         # Load wordvec
-        self.wordvec = np.load(f"wiki_zh-vec.npy")
-        self.wi = {w:i for i, w in enumerate(self.vocab)}
+        self.wordvec = np.load(self._path("wiki_zh-vec.npy"), mmap_mode=mmap_mode)
+
+    def _path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def loadIndex(self, path="wiki_zh-ivf.npz", **kwargs):
+        """Load the approximate nearest-neighbor index, building it if needed
+
+        The saved index is rebuilt if it doesn't match the vectors: a
+        different number of words or dimension, or older than the 
+        vectors file.
+
+        Parameters
+        ----------
+        path : str, optional
+            Index file, relative to ``data_dir``, by default "wiki_zh-ivf.npz"
+        **kwargs
+            Passed to :py:meth:`ann.IVFIndex.build` when the index is built.
+
+        Returns
+        -------
+        IVFIndex
+        """
+
+        path = self._path(path)
+        self.index = None
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(self._path("wiki_zh-vec.npy")):
+            index = IVFIndex.load(path)
+            if len(index.order) == self.wordvec.shape[0] and index.centroids.shape[1] == self.wordvec.shape[1]:
+                self.index = index
+        if self.index is None:
+            self.index = IVFIndex.build(self.wordvec, **kwargs)
+            self.index.save(path)
+        return self.index
+
+    @property
+    def wi(self):
+        """Word-to-index dict (built on first use)"""
+        if self._wi is None:
+            self._wi = {w:i for i, w in enumerate(self.vocab)}
+        return self._wi
         
     def getWordvec(self, w):
-        if isinstance(w, str):
+        return self.wordvec[self._index(w)]
+
+    def _index(self, w):
+        if not isinstance(w, str):
+            return w
+        if self._order is None:
             try:
-                idx = self.wi[w]
+                return self.wi[w]
             except:
                 raise Exception("Word not in vocabulary")
-        else:
-            idx = w
-        return self.wordvec[idx]
+
+        # Binary search in the sorted vocabulary
+        lo, hi = 0, len(self._order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.vocab[self._order[mid]] < w:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(self._order) or self.vocab[self._order[lo]] != w:
+            raise Exception("Word not in vocabulary")
+        return int(self._order[lo])
+
+    def _dot(self, vecs, chunk=1 << 16):
+        """Dot products of all word vectors with ``vecs``, read in chunks of rows"""
+        vecs = np.asarray(vecs, dtype=np.float32)
+        out = np.empty((len(self.wordvec), vecs.shape[1]), dtype=np.float32)
+        for i in range(0, len(self.wordvec), chunk):
+            out[i:i + chunk] = self.wordvec[i:i + chunk].astype(np.float32, copy=False) @ vecs
+        return out
 
 
     def cossim(self, w1, w2, isVec=False):
@@ -35,7 +126,63 @@ class Embeddings():
             return self.getWordvec(w1).dot(self.getWordvec(w2))
         else:
             return w1.dot(w2)
-    
+
+
+    def _topn(self, scores, top_n):
+        """Top ``top_n`` (score, word) of each column of ``scores``"""
+        top_n = min(top_n, len(scores))
+        idx = np.argpartition(-scores, top_n - 1, axis=0)[:top_n]
+        out = []
+        for j in range(scores.shape[1]):
+            col = idx[:, j][np.argsort(-scores[idx[:, j], j])]
+            out.append([(float(scores[i, j]), self.vocab[i]) for i in col])
+        return out
+
+
+    def most_similar(self, words, top_n=10, batch_size=64, approx=False, nprobe=16):
+        """Get the nearest neighbors of words by cosine similarity
+        
+        Parameters
+        ----------
+        words : Union[str, int, List[Union[str, int]]]
+            A word, or a list of words
+        top_n : int, optional
+            Number of neighbors to return, by default 10
+        batch_size : int, optional
+            Number of words scored at once, by default 64
+        approx : bool, optional
+            Search with the approximate index (see :py:meth:`.loadIndex`), 
+            by default False
+        nprobe : int, optional
+            Number of index clusters searched when ``approx``, by default 16
+
+        Returns
+        -------
+        list
+            ``(similarity, word)`` pairs in descending order, or a list of 
+            them for each word if ``words`` is a list.
+        """
+
+        single = not isinstance(words, (list, tuple))
+        idx = np.array([self._index(w) for w in ([words] if single else words)])
+
+        if approx:
+            if self.index is None:
+                self.loadIndex()
+            res = self.index.search(self.wordvec, self.wordvec[idx], top_n, nprobe, exclude=idx)
+            out = [[(float(s), self.vocab[i]) for i, s in zip(ids, scores)] for ids, scores in res]
+            return out[0] if single else out
+
+        out = []
+        for i in range(0, len(idx), batch_size):
+            q = idx[i:i + batch_size]
+            scores = self._dot(self.wordvec[q].T)
+            scores[q, np.arange(len(q))] = -np.inf   # Exclude the word itself
+            out += self._topn(scores, top_n)
+
+        return out[0] if single else out
+
+
     def analogy(self, a1, a2, b1, top_n=3, e=0.001):
         """Get analogy by cosine multiplication
         
@@ -51,29 +198,50 @@ class Embeddings():
             Number of analogies to return, by default 3
         """
 
-        # Get vocab
-        vocab = set(self.wi.keys())
-        for w in [a1, a2, b1]:
-            if w in vocab:
-                vocab.remove(w)
+        return self.analogies([(a1, a2, b1)], top_n=top_n, e=e)[0]
 
-        # Analogy cosine (see Levy et al. 2015)
-        def cosMul(b2):
-            try:
-                out = (self.cossim(b2, a1) * self.cossim(b2, b1)) / (self.cossim(b2, a1) + e)
-            except:
-                print(a1, b1, b2)
-                return
-            return out
 
-        similarities = sorted(( (cosMul(b2), b2) for b2 in vocab ), reverse=True)
+    def analogies(self, queries, top_n=3, e=0.001, batch_size=32):
+        """Solve many analogies ``a1 : a2 = b1 : ?`` at once
+
+        Analogy cosine (3CosMul, see Levy et al. 2015): the answer ``b2``
+        maximizes ``cos(b2, a2) * cos(b2, b1) / (cos(b2, a1) + e)``, with
+        cosines shifted to [0, 1].
+        
+        Parameters
+        ----------
+        queries : list
+            ``(a1, a2, b1)`` tuples of words
+        top_n : int, optional
+            Number of analogies to return for each query, by default 3
+        e : float, optional
+            Smoothing term, by default 0.001
+        batch_size : int, optional
+            Number of queries scored at once, by default 32
+
+        Returns
+        -------
+        list
+            ``(score, word)`` pairs in descending order, for each query.
+        """
 
-        return similarities[:top_n]
+        idx = np.array([[self._index(w) for w in q] for q in queries]).reshape(-1, 3)
 
-embed = Embeddings()
+        out = []
+        for i in range(0, len(idx), batch_size):
+            q = idx[i:i + batch_size]
+            cos = (self._dot(self.wordvec[q.ravel()].T) + 1) / 2
+            cos = cos.reshape(len(cos), len(q), 3)
+            scores = cos[:, :, 1] * cos[:, :, 2] / (cos[:, :, 0] + e)
+            scores[q, np.arange(len(q))[:, None]] = -np.inf   # Exclude query words
+            out += self._topn(scores, top_n)
 
-#%%
-embed.cossim("美國", "中國")
+        return out
 
 #%%
-embed.analogy("陳水扁", "呂秀蓮", "馬英九", top_n=10)
\ No newline at end of file
+if __name__ == "__main__":
+    embed = Embeddings()
+
+    print(embed.cossim("美國", "中國"))
+    print(embed.analogy("陳水扁", "呂秀蓮", "馬英九", top_n=10))
+    print(embed.most_similar(["美國", "中國"], top_n=10))
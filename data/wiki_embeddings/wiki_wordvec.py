@@ -1,32 +1,46 @@
 #%%
+import os
 import numpy as np
-import pickle
+
+DTYPE = 'float32'   # 'float16' halves the file size
+VEC_FILE = "wiki_zh-vec.npy"
+VOCAB_FILE = "wiki_zh-vocab.txt"
 
 with open("wiki.zh.vector") as f:
-    raw = f.readlines()
+    n, dim = (int(x) for x in f.readline().split())
 
-words = []
-wordvecs = []
-for i, l in enumerate(raw):
-    if i == 0: continue
-    
-    l = l.split()
-    # Bug in vector file: wiki.zh.vector
-    if len(l) != 401:
-        print(f"{i}th word: `{l[0]}` vector length = {len(l) - 1}")
-        continue
+    # Write vectors straight to a preallocated `.npy` file
+    tmp_file = VEC_FILE + ".tmp"
+    wordvecs = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=DTYPE, shape=(n, dim))
 
-    word = l[0]
-    vec = np.array( [float(e) for e in l[1:]] , dtype='float')
-    vec = vec / np.linalg.norm(vec)  # regularize to unit length
+    words = []
+    for i, l in enumerate(f, start=1):
+        word, _, vec = l.rstrip('\n').partition(' ')
+        vec = np.fromstring(vec, dtype=np.float32, sep=' ')
+        # Bug in vector file: wiki.zh.vector
+        if len(vec) != dim:
+            print(f"{i}th word: `{word}` vector length = {len(vec)}")
+            continue
 
-    # Add word
-    words.append(word)
-    wordvecs.append(vec)
+        # Add word
+        wordvecs[len(words)] = vec / np.linalg.norm(vec)  # regularize to unit length
+        words.append(word)
 
 #%%
-wordvecs = np.array(wordvecs)
+# Drop the rows of skipped words
+if len(words) < n:
+    out = np.lib.format.open_memmap(VEC_FILE, mode='w+', dtype=DTYPE, shape=(len(words), dim))
+    for i in range(0, len(words), 1 << 16):
+        out[i:i + (1 << 16)] = wordvecs[i:min(i + (1 << 16), len(words))]
+    out.flush()
+    del out, wordvecs
+    os.remove(tmp_file)
+else:
+    wordvecs.flush()
+    del wordvecs
+    os.replace(tmp_file, VEC_FILE)
 
-np.save("wiki_zh-vec.npy", wordvecs)
-with open("wiki_zh-vocab.pkl", "wb") as f:
-    pickle.dump(words, f)
\ No newline at end of file
+# Vocabulary, in row order, and its sort order for binary search
+with open(VOCAB_FILE, "w") as f:
+    f.writelines(w + '\n' for w in words)
+np.save("wiki_zh-vocab-order.npy", np.argsort(np.array(words)).astype(np.int32))
@@ -1,54 +1,21 @@
 #%%
-import json
-import networkx as nx
-import datetime
+# Usage: python3 preprocess_status_triangles.py [<board_name> <year1,year2,...>]
+import sys
+from pttnet import stages
+from pttnet.metrics import Metrics
 
 
-with open("data/signed_network/triangles_2015_HatePolitics.jsonl") as f:
+BOARD = sys.argv[1] if len(sys.argv) > 1 else 'HatePolitics'
+YEARS = sys.argv[2].split(',') if len(sys.argv) > 2 else ['2015']
+DATA_DIR = 'data/signed_network/'   # Reads triangles_<years>_<board>/, writes triangles_<years>_<board>_status.json
+GML_SAMPLE = 0          # Number of triads randomly sampled for GML export (0: no export)
+BATCH_SIZE = 100000     # Number of triads classified at once
 
-    for line in f:
-        data = json.loads(line)
 
-        # Extract triads
-        key = list(data.keys())[0]
-        triads = tuple(int(i) for i in key.split("_"))
-
-        edge_num_AB = len(data[key]['AB']['drct'])
-        edge_num_AX = len(data[key]['AX']['drct'])
-        edge_num_BX = len(data[key]['BX']['drct'])
-
-        for i in range(edge_num_AB):
-            for j in range(edge_num_AX):
-                for k in range(edge_num_BX):
-
-                    # date
-                    dt_AB = datetime.date.fromisoformat(data[key]['AB']['date'][i])
-                    dt_AX = datetime.date.fromisoformat(data[key]['AX']['date'][j])
-                    dt_BX = datetime.date.fromisoformat(data[key]['BX']['date'][k])
-
-                    # AB formed after AX and BX
-                    if dt_AB > dt_AX and dt_AB > dt_BX:
-                        G = nx.DiGraph()
-                        G.add_edge(triads[0], triads[1], sign = data[key]['AB']['sign'], date = dt_AB.isoformat())
-
-                        if data[key]['AX']['drct'][j] == 1:
-                            G.add_edge(triads[0], triads[2], sign = data[key]['AX']['sign'], date = dt_AX.isoformat())
-                        elif data[key]['AX']['drct'][j] == -1:
-                            G.add_edge(triads[2], triads[0], sign = data[key]['AX']['sign'], date = dt_AX.isoformat())
-                        else:
-                            raise Exception("Unexpected direction in `AX`")
-
-                        if data[key]['BX']['drct'][k] == 1:
-                            G.add_edge(triads[1], triads[2], sign = data[key]['BX']['sign'], date = dt_BX.isoformat())
-                        elif data[key]['BX']['drct'][k] == -1:
-                            G.add_edge(triads[2], triads[1], sign = data[key]['BX']['sign'], date = dt_BX.isoformat())
-                        else:
-                            raise Exception("Unexpected direction in `BX`")
-
-                        with open("data/signed_network/triangles_2015_HatePolitics_processed.gmll", "a") as f:
-                            G_s = ''.join(nx.generate_gml(G))
-                            f.write(G_s)
-                            f.write('\n')
+#%%
+metrics = Metrics(f'preprocess_status_triangles_{".".join(YEARS)}_{BOARD}')
+stages.status_triangles(BOARD, YEARS, data_dir=DATA_DIR, gml_sample=GML_SAMPLE, batch_size=BATCH_SIZE, metrics=metrics)
+metrics.save()
 
 
-#H = nx.parse_gml(G_s, destringizer=lambda x: int(x))
\ No newline at end of file
+#H = nx.parse_gml(G_s, destringizer=lambda x: int(x))
@@ -0,0 +1,4 @@
+import sys
+from pttnet.cli import main
+
+sys.exit(main())
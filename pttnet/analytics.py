@@ -0,0 +1,279 @@
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+from pttnet.signed_network.csr import SignedCSR
+
+
+def adjacency(G, weight='weight', nodelist=None):
+    """Sparse adjacency matrix of a graph, with its node order
+
+    Parameters
+    ----------
+    G : nx.Graph, nx.MultiDiGraph or SignedCSR
+        E.g., the weighted graph from :py:func:`pttnet.graph.Graph` or the
+        signed network from :py:func:`pttnet.signed_network.graph.MultiDiGraph`.
+    weight : str, optional
+        Edge attribute used as the entry of an edge, by default 'weight'.
+        Edges without the attribute count as 1, and multi-edges are summed,
+        so ``weight=None`` gives the number of edges between two nodes.
+        For a ``SignedCSR``, only ``'sign'`` is an attribute; anything else
+        counts edges.
+    nodelist : list, optional
+        Nodes of the rows and columns, by default None (``list(G)``, or
+        all node ids of a ``SignedCSR``)
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Shape ``(len(nodes), len(nodes))``, entry ``[i, j]`` for edges
+        from ``nodes[i]`` to ``nodes[j]``. Symmetric for undirected graphs.
+        Every pair of nodes with an edge has a stored entry, even if its
+        weights sum to 0 (e.g., opposite signs), so the structure of the
+        graph is the sparsity pattern of the matrix.
+    list or np.ndarray
+        Nodes of the rows and columns.
+
+    Examples
+    --------
+    >>> G = Graph(count_edges_in={'opinion': ['pos-pos', 'neg-neg']}, MG=MG)
+    >>> A, nodes = adjacency(G)
+    >>> S = MultiDiGraph(board='Gossiping', years=[2015], backend='csr')
+    >>> A, ids = adjacency(S, weight='sign')
+    """
+
+    if isinstance(G, SignedCSR):
+        data = G.sign if weight == 'sign' else np.ones(G.number_of_edges(), dtype=np.int8)
+        A = sp.csr_matrix((data.astype(np.float64), (G.src, G.dst)), shape=(G.n, G.n))
+        if nodelist is None:
+            return A, np.arange(G.n)
+        nodelist = np.asarray(nodelist)
+        return A[nodelist][:, nodelist], nodelist
+
+    nodes = list(G) if nodelist is None else list(nodelist)
+    index = {n: i for i, n in enumerate(nodes)}
+    row, col, data = [], [], []
+    for u, v, w in G.edges(data=weight, default=1):
+        i, j = index.get(u), index.get(v)
+        if i is None or j is None: continue
+        row.append(i)
+        col.append(j)
+        data.append(w)
+        # Undirected edges are stored once in networkx
+        if not G.is_directed() and i != j:
+            row.append(j)
+            col.append(i)
+            data.append(w)
+
+    # Duplicates (multi-edges) are summed
+    A = sp.csr_matrix(
+        (np.array(data, dtype=np.float64), (np.array(row, dtype=np.int64), np.array(col, dtype=np.int64))),
+        shape=(len(nodes), len(nodes))
+    )
+    return A, nodes
+
+
+def degree(A, weighted=False):
+    """Degree (or weighted degree) of every row of an adjacency matrix
+
+    The degree counts stored entries (neighbors), the weighted degree sums
+    them. Same as ``G.degree`` in networkx for symmetric matrices of
+    simple graphs, where a self-loop counts twice. For directed graphs, 
+    this is the out-degree; use ``A.T`` for the in-degree.
+    """
+
+    A = sp.csr_matrix(A)
+    if weighted:
+        return np.asarray(A.sum(axis=1)).ravel() + A.diagonal()
+    loops = np.zeros(A.shape[0], dtype=np.int64)
+    coo = A.tocoo()
+    np.add.at(loops, coo.row[coo.row == coo.col], 1)
+    return A.getnnz(axis=1) + loops
+
+
+def pagerank(A, alpha=0.85, personalization=None, max_iter=100, tol=1.0e-6):
+    """PageRank of the nodes of an adjacency matrix, by power iteration
+
+    Same algorithm as ``nx.pagerank``: edges are weighted by the entries
+    of ``A``, and dangling nodes (rows summing to zero) jump to nodes
+    according to ``personalization``.
+
+    Parameters
+    ----------
+    A : scipy.sparse matrix
+        Square adjacency matrix with non-negative entries, e.g., from
+        :py:func:`.adjacency`.
+    alpha : float, optional
+        Damping factor, by default 0.85
+    personalization : array_like, optional
+        Teleport weights of the nodes, by default None (uniform)
+    max_iter : int, optional
+        Maximum number of iterations, by default 100
+    tol : float, optional
+        Convergence tolerance, scaled by the number of nodes (as in
+        networkx), by default 1.0e-6
+
+    Returns
+    -------
+    np.ndarray
+        PageRank of each row, summing to 1.
+
+    Raises
+    ------
+    ValueError
+        If ``A`` has negative entries.
+    nx.PowerIterationFailedConvergence
+        If not converged within ``max_iter`` iterations.
+    """
+
+    A = sp.csr_matrix(A, dtype=np.float64)
+    N = A.shape[0]
+    if N == 0:
+        return np.zeros(0)
+    if (A.data < 0).any():
+        raise ValueError("PageRank is undefined for negative edge weights (e.g., signs); use `adjacency(G, weight=None)`")
+
+    # Row-stochastic transition matrix
+    out = np.asarray(A.sum(axis=1)).ravel()
+    dangling = out == 0
+    P = sp.diags(np.divide(1.0, out, out=np.zeros(N), where=~dangling)) @ A
+
+    p = np.full(N, 1.0 / N) if personalization is None else np.asarray(personalization, dtype=np.float64)
+    p = p / p.sum()
+    x = np.full(N, 1.0 / N)
+    PT = P.T.tocsr()
+    for _ in range(max_iter):
+        xlast = x
+        x = alpha * (PT @ x + x[dangling].sum() * p) + (1 - alpha) * p
+        if np.abs(x - xlast).sum() < N * tol:
+            return x
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def triangles(A):
+    """Number of triangles through each node of an adjacency matrix
+
+    Edge weights and self-loops are ignored: any stored entry is an edge.
+    A directed adjacency is made symmetric first, as in :py:func:`.clustering`.
+    """
+
+    B = _binary(A)
+    B = B.maximum(B.T)
+    return np.asarray((B @ B).multiply(B).sum(axis=1)).ravel().astype(np.int64) // 2
+
+
+def clustering(A, weighted=False):
+    """Clustering coefficient of each node of a symmetric adjacency matrix
+
+    Counts triangles with sparse products instead of looking at every
+    pair of neighbors. Any stored entry is an edge, and self-loops are 
+    ignored. A directed adjacency is made symmetric first (an edge in 
+    either direction links two nodes).
+
+    Parameters
+    ----------
+    A : scipy.sparse matrix
+        Square adjacency matrix, e.g., from :py:func:`.adjacency`.
+    weighted : bool, optional
+        Use the geometric mean of the triangles' edge weights, normalized
+        by the largest weight, as ``nx.clustering(G, weight=...)`` does.
+        Weights must not be negative. By default False.
+
+    Returns
+    -------
+    np.ndarray
+        Clustering coefficient of each row, 0 for nodes with less than
+        two neighbors.
+
+    Raises
+    ------
+    ValueError
+        If ``weighted`` and ``A`` has negative entries.
+    """
+
+    A = sp.csr_matrix(A, dtype=np.float64)
+    B = _binary(A)
+    B = B.maximum(B.T)
+    k = B.getnnz(axis=1)
+
+    if weighted:
+        if (A.data < 0).any():
+            raise ValueError("Weighted clustering is undefined for negative edge weights (e.g., signs)")
+        W = A.maximum(A.T)
+        W = W - sp.diags(W.diagonal())
+        W.eliminate_zeros()
+        if W.nnz:
+            W = W / W.max()
+        W = W.power(1 / 3)
+        t = np.asarray((W @ W).multiply(W).sum(axis=1)).ravel()
+    else:
+        t = np.asarray((B @ B).multiply(B).sum(axis=1)).ravel()
+
+    pairs = k * (k - 1.0)
+    return np.divide(t, pairs, out=np.zeros(len(k)), where=pairs > 0)
+
+
+def _binary(A):
+    """Unweighted adjacency without self-loops, with a 1 for every stored entry"""
+
+    A = sp.coo_matrix(A)
+    keep = A.row != A.col
+    B = sp.csr_matrix((np.ones(keep.sum()), (A.row[keep], A.col[keep])), shape=A.shape)
+    B.data[:] = 1   # Duplicate entries are summed
+    return B
+
+
+def node_metrics(G, weight='weight', alpha=0.85, set_attributes=True):
+    """Degree, weighted degree, PageRank and clustering of all nodes
+
+    Computed on the sparse adjacency of the graph (see :py:func:`.adjacency`),
+    instead of node by node with networkx.
+
+    Parameters
+    ----------
+    G : nx.Graph or nx.MultiDiGraph
+        E.g., the weighted graph from :py:func:`pttnet.graph.Graph`.
+    weight : str, optional
+        Edge attribute of the weights, by default 'weight'
+    alpha : float, optional
+        Damping factor of PageRank, by default 0.85
+    set_attributes : bool, optional
+        Write the metrics back to ``G`` as node attributes ``degree``,
+        ``weighted_degree``, ``pagerank`` and ``clustering``, by default True
+
+    Returns
+    -------
+    dict
+        Metric name to array of values, in the order of ``list(G)``.
+        Degrees count edges (multi-edges included, both directions for 
+        a directed graph, self-loops twice) and weighted degrees sum 
+        their weights, as ``G.degree`` does. PageRank needs non-negative
+        weights, so for signed edges, use ``weight=None``.
+
+    Examples
+    --------
+    >>> G = Graph(count_edges_in={'opinion': ['pos-pos', 'neg-neg']}, MG=MG)
+    >>> metrics = node_metrics(G)
+    >>> G.nodes[n]['pagerank']
+    """
+
+    A, nodes = adjacency(G, weight)
+    C, _ = adjacency(G, None)   # Edge counts
+    if G.is_directed():
+        # Both directions count, as in networkx
+        deg = np.asarray(C.sum(axis=1) + C.sum(axis=0).T).ravel().astype(np.int64)
+        wdeg = np.asarray(A.sum(axis=1) + A.sum(axis=0).T).ravel()
+    else:
+        deg, wdeg = degree(C, weighted=True).astype(np.int64), degree(A, weighted=True)
+
+    metrics = {
+        'degree': deg,
+        'weighted_degree': wdeg,
+        'pagerank': pagerank(A, alpha),
+        'clustering': clustering(A),
+    }
+
+    if set_attributes:
+        for name, values in metrics.items():
+            nx.set_node_attributes(G, dict(zip(nodes, values.tolist())), name)
+
+    return metrics
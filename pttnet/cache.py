@@ -0,0 +1,126 @@
+import os
+import json
+import pickle
+import hashlib
+import datetime
+
+# Version of the pickled graphs' format, part of every key. Bump it when
+# the classes in cached graphs (e.g., ``pttnet.graph.Node``) change.
+FORMAT_VERSION = 2
+
+
+class GraphCache():
+
+    def __init__(self, dir_="data/network/cache", max_bytes=10 * 1024**3):
+        """On-disk cache of built graphs, keyed by their query parameters
+
+        Graphs are pickled (highest protocol) to files named after a hash
+        of the canonicalized parameters and the modification times of the
+        source files, so a cached graph is only reused while its inputs
+        are unchanged. Least recently used graphs are evicted once the
+        cache exceeds ``max_bytes``.
+
+        Parameters
+        ----------
+        dir_ : str, optional
+            Cache directory, by default "data/network/cache"
+        max_bytes : int, optional
+            Size limit of the cache, by default 10 GiB
+
+        Examples
+        --------
+        >>> cache = GraphCache()
+        >>> MG = MultiGraph(edge_condition=conditions, boards=['Boy-Girl'], years=[2010], cache=cache)
+        >>> G = Graph(count_edges_in=criteria, edge_condition=conditions, boards=['Boy-Girl'], years=[2010], cache=cache)
+        """
+
+        self.dir = dir_
+        self.max_bytes = max_bytes
+        os.makedirs(dir_, exist_ok=True)
+
+    def __repr__(self):
+        return f"<GraphCache, {self.dir}, {len(self._entries())} graphs>"
+
+
+    def key(self, files=(), **params):
+        """Hash of query parameters and the state of source files
+
+        Parameters
+        ----------
+        files : list, optional
+            Paths of files or directories the graph is built from. Their
+            sizes and modification times are part of the key. Directories
+            are not walked (that would cost a scan of, e.g., all node files 
+            on every lookup), so pass a file that changes with their
+            contents too, like the manifest of a node directory.
+        **params
+            Query parameters (sets, lists, dicts and dates are
+            canonicalized, so that equivalent queries share a key).
+
+        Returns
+        -------
+        str
+        """
+
+        stats = []
+        for fp in sorted(files):
+            st = os.stat(fp)
+            stats.append([fp, st.st_size, st.st_mtime_ns])
+        data = json.dumps([FORMAT_VERSION, _canonical(params), stats], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+    def _path(self, key):
+        return os.path.join(self.dir, key + '.pkl')
+
+    def _entries(self):
+        return [os.path.join(self.dir, f) for f in os.listdir(self.dir) if f.endswith('.pkl')]
+
+
+    def get(self, key):
+        """Load a cached graph, or return None if not cached"""
+
+        fp = self._path(key)
+        try:
+            with open(fp, 'rb') as f:
+                G = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        os.utime(fp)  # Mark as recently used
+        return G
+
+
+    def put(self, key, G):
+        """Save a graph, then evict least recently used graphs over the size limit"""
+
+        fp = self._path(key)
+        with open(fp + '.tmp', 'wb') as f:
+            pickle.dump(G, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(fp + '.tmp', fp)
+        self.evict()
+
+
+    def evict(self):
+        entries = sorted((os.stat(fp).st_mtime_ns, os.stat(fp).st_size, fp) for fp in self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, fp in entries:
+            if total <= self.max_bytes: break
+            os.remove(fp)
+            total -= size
+
+
+    def clear(self):
+        for fp in self._entries():
+            os.remove(fp)
+
+
+def _canonical(obj):
+    """Convert query parameters to a canonical, JSON serializable form"""
+
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    if isinstance(obj, (set, frozenset, list, tuple)):
+        return sorted((_canonical(v) for v in obj), key=lambda v: json.dumps(v, ensure_ascii=False, sort_keys=True))
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    return obj
@@ -0,0 +1,51 @@
+import sys
+import json
+import argparse
+from pttnet import pipeline
+
+
+def main(argv=None):
+    """Entry point of the ``pttnet`` command
+
+    Examples
+    --------
+    .. code-block:: bash
+
+        pttnet run --boards Gossiping,HatePolitics --years 2014,2015 --jobs 4
+        pttnet run triads status --config pipeline.json --force
+        pttnet status --config pipeline.json
+        pttnet config > pipeline.json
+    """
+
+    parser = argparse.ArgumentParser(prog='pttnet', description="PTT comments as social network data")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run pipeline stages, skipping up-to-date outputs")
+    status = commands.add_parser('status', help="Show the tasks that would run")
+    config = commands.add_parser('config', help="Print the resolved configuration as JSON")
+    for p in (run, status, config):
+        p.add_argument('stages', nargs='*', metavar='stage',
+                       help=f"Stages to run, by default all of: {', '.join(pipeline.STAGE_NAMES)}")
+        p.add_argument('--config', help="JSON configuration file")
+        p.add_argument('--boards', type=lambda x: x.split(','), help="Comma separated")
+        p.add_argument('--years', type=lambda x: x.split(','), help="Comma separated")
+        p.add_argument('--jobs', type=int, help="Number of tasks run at once")
+    run.add_argument('--force', action='store_true', help="Run tasks with up-to-date outputs")
+
+    args = parser.parse_args(argv)
+    for name in args.stages:
+        if name not in pipeline.STAGE_NAMES:
+            parser.error(f"invalid stage: {name} (choose from {', '.join(pipeline.STAGE_NAMES)})")
+    conf = pipeline.load_config(args.config, boards=args.boards, years=args.years, jobs=args.jobs)
+
+    if args.command == 'config':
+        print(json.dumps(conf, ensure_ascii=False, indent=2))
+        return 0
+
+    names = args.stages or None
+    result = pipeline.run(conf, names, force=getattr(args, 'force', False), dry_run=args.command == 'status')
+    return 1 if 'failed' in result.values() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
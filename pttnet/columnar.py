@@ -0,0 +1,136 @@
+import os
+import struct
+from array import array
+import numpy as np
+
+_MAGIC = b'\x93NUMPY\x01\x00'
+_HEADER_LEN = 118  # Reserved header size: 10 + 118 = 128 bytes
+
+
+class NpyWriter():
+
+    def __init__(self, path, dtype, shape=()):
+        """Append-only writer of a ``.npy`` file
+
+        Rows are streamed to disk as they come, and the array length in the
+        file header is filled in on :py:meth:`close`. The result is a regular
+        ``.npy`` file, readable with ``np.load(path, mmap_mode='r')``.
+
+        Parameters
+        ----------
+        path : str
+            Output file path.
+        dtype : str or np.dtype
+            Data type of the array.
+        shape : tuple, optional
+            Shape of one row, by default ``()`` (a 1-d array).
+        """
+
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.length = 0
+        self.f = open(path, 'wb')
+        self._writeHeader()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _writeHeader(self):
+        header = repr({
+            'descr': np.lib.format.dtype_to_descr(self.dtype),
+            'fortran_order': False,
+            'shape': (self.length,) + self.shape,
+        })
+        header = header.ljust(_HEADER_LEN - 1) + '\n'
+        if len(header) != _HEADER_LEN:
+            raise Exception(f"`.npy` header too long: {header}")
+        self.f.write(_MAGIC + struct.pack('<H', _HEADER_LEN) + header.encode('latin1'))
+
+    def write(self, rows):
+        rows = np.ascontiguousarray(rows, dtype=self.dtype).reshape((-1,) + self.shape)
+        rows.tofile(self.f)
+        self.length += len(rows)
+
+    def close(self):
+        if self.f.closed: return
+        self.f.seek(0)
+        self._writeHeader()
+        self.f.close()
+
+
+class ColumnWriter():
+
+    def __init__(self, dir_, columns, buffer_size=1 << 20):
+        """Buffered writer of a table stored as one ``.npy`` file per column
+
+        Parameters
+        ----------
+        dir_ : str
+            Output directory, created if it doesn't exist.
+        columns : dict
+            Column names mapped to their ``array`` typecodes
+            (e.g. ``{'src': 'i', 'sign': 'b'}``), in row order.
+        buffer_size : int, optional
+            Number of rows kept in memory before flushing to disk,
+            by default 1 << 20
+        """
+
+        os.makedirs(dir_, exist_ok=True)
+        self.names = list(columns)
+        self.buffers = [array(tc) for tc in columns.values()]
+        self.writers = [NpyWriter(os.path.join(dir_, f"{name}.npy"), np.dtype(tc)) for name, tc in columns.items()]
+        self.buffer_size = buffer_size
+        self.length = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, row):
+        """Append one row, given as a tuple in column order"""
+        for buf, v in zip(self.buffers, row):
+            buf.append(v)
+        self.length += 1
+        if len(self.buffers[0]) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        for buf, w in zip(self.buffers, self.writers):
+            w.write(np.frombuffer(buf, dtype=w.dtype))
+            del buf[:]
+
+    def close(self):
+        self.flush()
+        for w in self.writers:
+            w.close()
+
+
+def load_columns(dir_, columns=None, mmap_mode='r'):
+    """Load a table written by :py:class:`.ColumnWriter`
+
+    Parameters
+    ----------
+    dir_ : str
+        Directory of the ``.npy`` column files.
+    columns : list, optional
+        Names of the columns to load, by default None (all columns).
+    mmap_mode : str, optional
+        Passed to ``np.load``, by default 'r' (memory-map, read only).
+
+    Returns
+    -------
+    dict
+        Column names mapped to arrays.
+    """
+
+    if columns is None:
+        columns = sorted(f[:-4] for f in os.listdir(dir_) if f.endswith('.npy'))
+    return {
+        name: np.load(os.path.join(dir_, f"{name}.npy"), mmap_mode=mmap_mode) for name in columns
+    }
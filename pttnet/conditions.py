@@ -0,0 +1,157 @@
+import datetime
+import numpy as np
+from pttnet.utils import iso2ord
+
+
+class EdgeCondition():
+
+    def __init__(self, condition=None, start=None, end=None):
+        """Edge filter compiled from an ``edge_condition``/``count_edges_in`` dict
+
+        The dictionary is normalized once: values become sets, ``'nodes'``
+        becomes a set intersection test, and ``'date'`` becomes an integer
+        range comparison on day ordinals (or a set of ordinals, if the
+        dates are not consecutive).
+
+        Parameters
+        ----------
+        condition : dict, optional
+            See ``edge_condition`` in :py:func:`pttnet.graph.Graph`.
+            By default None (keep all edges).
+        start : str or datetime.date, optional
+            First date of edges to keep, combined with the ``'date'``
+            condition. By default None (no limit).
+        end : str or datetime.date, optional
+            Last date (inclusive) of edges to keep, by default None (no limit).
+
+        Examples
+        --------
+        >>> cond = EdgeCondition({'date': {'2010-01-01', '2010-01-02'}, 'opinion': ['pos-pos']})
+        >>> cond('node1', 'node2', {'date': '2010-01-02', 'opinion': 'pos-pos'})
+        True
+        >>> cond.mask({'src': src, 'dst': dst, 'date': date_ordinals, 'opinion': opinions})
+        >>> EdgeCondition({'opinion': ['pos-pos']}, start='2010-01-01', end='2010-01-30')
+        """
+
+        self.nodes = None     # set of node ids
+        self.dates = None     # set of day ordinals, or None
+        self.date_range = None  # (first, last) day ordinals, or None
+        self.attrs = []       # (attribute, set of values)
+
+        for k, v in (condition or {}).items():
+            if k == 'nodes':
+                self.nodes = frozenset(v)
+            elif k == 'date':
+                self._setDates(v)
+            else:
+                self.attrs.append((k, frozenset(v)))
+        if start is not None or end is not None:
+            self._setRange(start, end)
+
+
+    def __repr__(self):
+        return f"<EdgeCondition, nodes: {self.nodes is not None}, date range: {self.date_range}, attrs: {[k for k, _ in self.attrs]}>"
+
+    def _setDates(self, dates):
+        dates = {to_ordinal(d) for d in dates}
+        if dates and max(dates) - min(dates) + 1 == len(dates):
+            self.date_range = (min(dates), max(dates))
+        else:
+            self.dates = frozenset(dates)
+
+
+    def _setRange(self, start, end):
+        first = 1 if start is None else to_ordinal(start)
+        last = datetime.date.max.toordinal() if end is None else to_ordinal(end)
+        if self.dates is not None:
+            self.dates = frozenset(d for d in self.dates if first <= d <= last)
+        elif self.date_range is not None:
+            self.date_range = (max(first, self.date_range[0]), min(last, self.date_range[1]))
+        else:
+            self.date_range = (first, last)
+
+
+    @property
+    def filters_dates(self):
+        return self.date_range is not None or self.dates is not None
+
+    def checkDate(self, d):
+        """Test a date given as day ordinal"""
+        if self.date_range is not None:
+            return self.date_range[0] <= d <= self.date_range[1]
+        return self.dates is None or d in self.dates
+
+
+    def __call__(self, u, v, attr):
+        """Test an edge
+
+        Parameters
+        ----------
+        u, v : str
+            Node ids of the edge.
+        attr : dict
+            Edge attributes, with ``date`` in isoformat.
+
+        Returns
+        -------
+        bool
+            Whether the edge matches all conditions.
+        """
+
+        if self.filters_dates and not self.checkDate(iso2ord(attr['date'])):
+            return False
+
+        for k, values in self.attrs:
+            if attr[k] not in values:
+                return False
+
+        # Skip if no specified nodes present in edge
+        if self.nodes is not None and u not in self.nodes and v not in self.nodes:
+            return False
+
+        return True
+
+
+    def mask(self, columns):
+        """Test edges stored as columns
+
+        Parameters
+        ----------
+        columns : dict
+            Edge attributes mapped to arrays of equal length. Node
+            conditions use ``src`` and ``dst``, and dates must be day
+            ordinals.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask of the matching edges.
+        """
+
+        n = len(next(iter(columns.values())))
+        keep = np.ones(n, dtype=bool)
+
+        if self.date_range is not None:
+            date = np.asarray(columns['date'])
+            keep &= (date >= self.date_range[0]) & (date <= self.date_range[1])
+        elif self.dates is not None:
+            keep &= np.isin(columns['date'], list(self.dates))
+
+        for k, values in self.attrs:
+            keep &= np.isin(columns[k], list(values))
+
+        if self.nodes is not None:
+            nodes = list(self.nodes)
+            keep &= np.isin(columns['src'], nodes) | np.isin(columns['dst'], nodes)
+
+        return keep
+
+
+def to_ordinal(date):
+    """Day ordinal of an isoformat string, ``datetime.date`` or ordinal"""
+
+    if isinstance(date, str):
+        return iso2ord(date)
+    if isinstance(date, datetime.date):
+        return date.toordinal()
+    return int(date)
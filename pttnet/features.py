@@ -0,0 +1,310 @@
+import os
+import json
+import hashlib
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+from pttnet.graph import Node, corpus_key
+
+# In-memory cache of node embeddings: (model fingerprint, key) -> {node_id: vector}
+_EMBEDDINGS_CACHE = {}
+
+
+def vocab_count_matrix(vocabs, word_index):
+    """Sparse count matrix of vocabularies against a word index
+
+    Parameters
+    ----------
+    vocabs : list
+        Vocabulary dicts (word: count), one per row.
+    word_index : dict
+        Words mapped to column indices. Words not in ``word_index`` are
+        ignored.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Shape ``(len(vocabs), len(word_index))``.
+    """
+
+    indptr, indices, data = [0], [], []
+    for vocab in vocabs:
+        for w, c in vocab.items():
+            i = word_index.get(w)
+            if i is not None:
+                indices.append(i)
+                data.append(c)
+        indptr.append(len(indices))
+
+    return sp.csr_matrix(
+        (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(len(vocabs), len(word_index))
+    )
+
+
+def node_embeddings(nodes, wordvec, vocab, start="1900-01-01", end="2050-12-31", boards=None, cache_dir=None):
+    """Author-level semantic vectors of nodes
+
+    The vector of a node is the mean of the word vectors in its vocabulary
+    (see :py:meth:`pttnet.graph.Node.getCorpusStats`), weighted by word
+    frequency. All nodes are computed at once, by multiplying a sparse
+    node-by-word count matrix with the embedding matrix.
+
+    Parameters
+    ----------
+    nodes : list
+        :py:class:`pttnet.graph.Node` objects.
+    wordvec : np.ndarray
+        Word vectors, one row per word (e.g., ``Embeddings.wordvec``).
+    vocab : list
+        Words of the rows of ``wordvec`` (e.g., ``Embeddings.vocab``).
+    start : str, optional
+        Start date in isoformat, by default "1900-01-01"
+    end : str, optional
+        End date in isoformat, by default "2050-12-31"
+    boards : set, optional
+        A set of boards to include, by default None
+    cache_dir : str, optional
+        Directory to cache the vectors on disk, one file per
+        ``(start, end, boards)`` key and embedding model (see
+        :py:func:`.model_fingerprint`). By default None (cache in memory
+        only).
+
+    Returns
+    -------
+    list
+        Node ids, in the order of ``nodes``.
+    np.ndarray
+        Node vectors, shape ``(len(nodes), dim)``. Nodes without any
+        word in ``vocab`` get zero vectors.
+    """
+
+    key = corpus_key(start, end, boards)
+    model = model_fingerprint(wordvec, vocab)
+    cache = _EMBEDDINGS_CACHE.setdefault((model, key), {})
+    fp = None if cache_dir is None else os.path.join(cache_dir, f"embeddings_{key}_{model}.npz")
+    if not cache and fp is not None and os.path.exists(fp):
+        data = np.load(fp)
+        cache.update(zip(data['ids'].tolist(), data['vecs']))
+
+    # Compute nodes missing from the cache
+    ids = [n.id for n in nodes]
+    missing = [n for n in nodes if n.id not in cache]
+    if missing:
+        word_index = {w: i for i, w in enumerate(vocab)}
+        counts = vocab_count_matrix([n.getCorpusStats(start, end, boards)[1] for n in missing], word_index)
+        total = np.asarray(counts.sum(axis=1)).ravel()
+        vecs = np.asarray(counts @ wordvec, dtype=np.float32)
+        vecs /= np.where(total == 0, 1, total)[:, None]
+        cache.update(zip((n.id for n in missing), vecs))
+
+        if fp is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez(fp, ids=np.array(list(cache)), vecs=np.array(list(cache.values())))
+
+    return ids, np.array([cache[i] for i in ids], dtype=np.float32).reshape(len(ids), wordvec.shape[1])
+
+
+def model_fingerprint(wordvec, vocab, sample=1024):
+    """Short hash identifying an embedding model
+
+    Hashes the vocabulary, the shape and type of the word vectors and 
+    ``sample`` evenly spaced rows of them, which is cheap even for large
+    models.
+    """
+
+    h = hashlib.sha256()
+    h.update(json.dumps([list(wordvec.shape), str(wordvec.dtype), len(vocab)]).encode('utf-8'))
+    h.update('\n'.join(vocab).encode('utf-8'))
+    if len(wordvec):
+        rows = np.unique(np.linspace(0, len(wordvec) - 1, min(sample, len(wordvec))).astype(np.int64))
+        h.update(np.ascontiguousarray(wordvec[rows]).tobytes())
+    return h.hexdigest()[:16]
+
+
+def node_ids(node_path="data/network/nodes"):
+    """Ids of the nodes saved in a directory, in sorted order"""
+
+    ext = '-stats.json'
+    return sorted(f[:-len(ext)] for f in os.listdir(node_path) if f.endswith(ext))
+
+
+def author_term_matrix(node_path="data/network/nodes", start="1900-01-01", end="2050-12-31", boards=None, ids=None, vocab=None, chunk_size=1000, chunk_dir=None):
+    """Sparse author-by-term count matrix of all nodes
+
+    Nodes are streamed from disk in chunks, so only ``chunk_size`` node
+    corpora are in memory at a time. The (much smaller) count matrices
+    of the chunks are kept in memory and stacked at the end.
+
+    Parameters
+    ----------
+    node_path : str, optional
+        Path to the directory of node files, by default "data/network/nodes"
+    start : str, optional
+        Start date in isoformat, by default "1900-01-01"
+    end : str, optional
+        End date in isoformat, by default "2050-12-31"
+    boards : set, optional
+        A set of boards to include, by default None
+    ids : list, optional
+        Ids of the nodes to include, by default None (all nodes in 
+        ``node_path``)
+    vocab : list, optional
+        Fixed vocabulary (columns). By default None: all words, in order 
+        of first occurrence.
+    chunk_size : int, optional
+        Number of nodes per chunk, by default 1000
+    chunk_dir : str, optional
+        Directory to save each chunk to. Chunks already saved are loaded
+        instead of recomputed, so an interrupted build can be resumed.
+        Chunk files are named after a hash of the chunk's node ids, the
+        state of their node files, the date range, boards and ``vocab``,
+        so chunks of a different query are never reused. By default None
+        (don't save chunks).
+
+    Returns
+    -------
+    list
+        Node ids (rows).
+    scipy.sparse.csr_matrix
+        Term counts, shape ``(len(ids), len(vocab))``.
+    list
+        Vocabulary (columns).
+    np.ndarray
+        Document frequencies: number of authors using each term.
+    """
+
+    ids = node_ids(node_path) if ids is None else list(ids)
+    fixed = vocab is not None
+    word_index = {w: i for i, w in enumerate(vocab)} if fixed else {}
+    vocab = list(vocab) if fixed else []
+    if chunk_dir is not None:
+        os.makedirs(chunk_dir, exist_ok=True)
+    
+    vocab_hash = hashlib.sha256('\n'.join(vocab).encode('utf-8')).hexdigest() if fixed else None
+
+    chunks = []
+    for c, i in enumerate(range(0, len(ids), chunk_size)):
+        fp = None
+        if chunk_dir is not None:
+            fp = os.path.join(chunk_dir, f"chunk_{c:05d}_{_chunk_hash(node_path, ids[i:i + chunk_size], start, end, boards, vocab_hash)}")
+        if fp is not None and os.path.exists(fp + '.npz'):
+            X = sp.load_npz(fp + '.npz')
+            with open(fp + '.txt') as f:
+                words = f.read().split('\n')[:-1]
+        else:
+            # Chunk with a local vocabulary
+            vocabs = [Node(id_, from_disk=node_path).getCorpusStats(start, end, boards)[1] for id_ in ids[i:i + chunk_size]]
+            if fixed:
+                words = vocab
+            else:
+                words = list(dict.fromkeys(w for v in vocabs for w in v))
+            X = vocab_count_matrix(vocabs, {w: j for j, w in enumerate(words)})
+            if fp is not None:
+                sp.save_npz(fp + '.npz', X)
+                with open(fp + '.txt', 'w') as f:
+                    f.writelines(w + '\n' for w in words)
+
+        # Map local columns to the shared vocabulary
+        if not fixed:
+            for w in words:
+                if w not in word_index:
+                    word_index[w] = len(vocab)
+                    vocab.append(w)
+            X = sp.csr_matrix((X.data, np.array([word_index[w] for w in words], dtype=np.int64)[X.indices], X.indptr), shape=(X.shape[0], len(vocab)))
+        chunks.append(X)
+
+    for X in chunks:
+        X.resize((X.shape[0], len(vocab)))
+    X = sp.vstack(chunks, format='csr') if chunks else sp.csr_matrix((0, len(vocab)), dtype=np.float32)
+    X.sum_duplicates()
+    df = np.bincount(X.indices, minlength=len(vocab))
+
+    return ids, X, vocab, df
+
+
+def _chunk_hash(node_path, ids, start, end, boards, vocab_hash):
+    """Hash of the inputs of a chunk of :py:func:`.author_term_matrix`"""
+
+    files = []
+    for id_ in ids:
+        for ext in ('-stats.json', '-corp.jsonl'):
+            st = os.stat(os.path.join(node_path, id_ + ext))
+            files.append([st.st_size, st.st_mtime_ns])
+    data = json.dumps([corpus_key(start, end, boards), ids, files, vocab_hash], ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+
+def tfidf(X, df):
+    """TF-IDF weighting of an author-by-term count matrix
+
+    Parameters
+    ----------
+    X : scipy.sparse.csr_matrix
+        Counts, as returned by :py:func:`.author_term_matrix`.
+    df : np.ndarray
+        Document frequencies of the terms.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        ``X * log(n_authors / df)``.
+    """
+
+    idf = np.log(X.shape[0] / np.maximum(df, 1)).astype(np.float32)
+    return sp.csr_matrix(X.multiply(idf[None, :]))
+
+
+def edge_similarity(G, X, ids, attr='similarity', batch_size=1 << 16):
+    """Cosine similarity of the two authors of every edge, in batches
+
+    Parameters
+    ----------
+    G : nx.Graph
+        Graph of :py:class:`pttnet.graph.Node` (e.g., from 
+        :py:func:`pttnet.graph.Graph`), or of node ids.
+    X : np.ndarray or scipy.sparse matrix
+        One row per author, e.g. the author-by-term matrix of
+        :py:func:`.author_term_matrix` or the vectors of
+        :py:func:`.node_embeddings`.
+    ids : list
+        Node ids of the rows of ``X``.
+    attr : str, optional
+        Edge attribute to store the similarities in, by default 'similarity'.
+        Edges with an author not in ``ids`` get ``nan``.
+    batch_size : int, optional
+        Number of edges computed at once, by default 1 << 16
+
+    Returns
+    -------
+    np.ndarray
+        Similarities, in the order of ``G.edges()``.
+    """
+
+    index = {id_: i for i, id_ in enumerate(ids)}
+    edges = list(G.edges())
+    u = np.array([index.get(getattr(n, 'id', n), -1) for n, _ in edges], dtype=np.int64)
+    v = np.array([index.get(getattr(n, 'id', n), -1) for _, n in edges], dtype=np.int64)
+
+    # Normalize rows to unit length
+    if sp.issparse(X):
+        X = sp.csr_matrix(X, dtype=np.float32)
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        X = sp.diags(1 / np.where(norms == 0, 1, norms)) @ X
+    else:
+        X = np.asarray(X, dtype=np.float32)
+        norms = np.linalg.norm(X, axis=1)
+        X = X / np.where(norms == 0, 1, norms)[:, None]
+
+    # Row-wise dot products of the endpoint rows
+    sims = np.full(len(edges), np.nan, dtype=np.float32)
+    valid = np.flatnonzero((u >= 0) & (v >= 0))
+    for i in range(0, len(valid), batch_size):
+        e = valid[i:i + batch_size]
+        if sp.issparse(X):
+            sims[e] = np.asarray(X[u[e]].multiply(X[v[e]]).sum(axis=1)).ravel()
+        else:
+            sims[e] = np.einsum('ij,ij->i', X[u[e]], X[v[e]])
+
+    nx.set_edge_attributes(G, dict(zip(edges, sims.tolist())), attr)
+    return sims
@@ -3,12 +3,25 @@ import datetime
 import json
 import pickle
 import os
+import sys
 import itertools
 import networkx as nx
-from pttnet.utils import merge_dicts
+from pttnet.utils import iso2ord
+from pttnet.conditions import EdgeCondition
+from pttnet.preprocess import PostTable
 
+# Edge attributes stored once per post, in the posts file next to an edge file
+POST_ATTRS = ('title', 'isRe', 'tag', 'board')
 
-def Graph(count_edges_in, edge_condition=None, MG=None, years=[], boards=[], node_path="data/network/nodes", edge_path="data/network/edges"):
+# Boards and years whose comments are in a node directory, rewritten on every
+# update of the node files (see :py:func:`pttnet.stages.comment2nodes`)
+NODE_MANIFEST = 'manifest.json'
+
+# Date indexes of edge files whose sidecar couldn't be written: (path, size, mtime) -> runs
+_DATE_INDEXES = {}
+
+
+def Graph(count_edges_in, edge_condition=None, MG=None, years=[], boards=[], node_path="data/network/nodes", edge_path="data/network/edges", cache=None, start=None, end=None):
     """Generate nx.Graph from PTT comment data
     
     Parameters
@@ -27,6 +40,9 @@ def Graph(count_edges_in, edge_condition=None, MG=None, years=[], boards=[], nod
               'opinion': {'pos-pos', 'pos-neg', 'pos-neu', ...}
             }
         
+        Conditions on post metadata (``title``, ``isRe``, ``tag`` and 
+        ``board``) are looked up in the posts files next to the edge files
+        (see :py:func:`.load_posts`).
         Data passed to :py:func:`.loadMGraph`.
     count_edges_in : dict, optional
         Criteria to reduce nx.MultiGraph into nx.Graph. The structure is similar 
@@ -34,6 +50,7 @@ def Graph(count_edges_in, edge_condition=None, MG=None, years=[], boards=[], nod
         values in a criterion are collapsed into 1 edge (with weight equals count).
         Edges in the MultiGraph not matching the criteria are pruned. Use emty dict
         ``{}`` to collapse all the same edges in the MultiGraph (regardless of criteria).
+        For a range of dates, use ``start`` and ``end`` instead of a ``'date'`` set.
     MG : nx.MultiGraph, optional
         nx.MultiGraph to start from. If specified, will use the MultiGraph (created from
         :py:func:`.MutiGraph`) from memory instead of reading the node and edge files
@@ -44,6 +61,17 @@ def Graph(count_edges_in, edge_condition=None, MG=None, years=[], boards=[], nod
     edge_path : str, optional
         Path to the directory of edge files, by default "data/network/edges". 
         Data passed to :py:func:`.MutiGraph`.
+    years, boards : list or str, optional
+        Edge files to load, see :py:func:`.MultiGraph`. By default [].
+    cache : GraphCache, optional
+        Cache of built graphs (see :py:class:`pttnet.cache.GraphCache`). Used
+        only when ``MG`` is None, and also passed to :py:func:`.MultiGraph`.
+        By default None.
+    start : str or datetime.date, optional
+        First date of the edges, by default None (no limit). Applies to
+        both loading the MultiGraph and reducing it.
+    end : str or datetime.date, optional
+        Last date (inclusive) of the edges, by default None (no limit).
     
     Returns
     -------
@@ -52,18 +80,15 @@ def Graph(count_edges_in, edge_condition=None, MG=None, years=[], boards=[], nod
 
     Examples
     --------
-    First create a ``networkx.MultiGraph`` with :py:func:`.loadMGraph`
+    First create a ``networkx.MultiGraph`` with :py:func:`.MultiGraph`
     then reduce it to a ``networkx.Graph`` with :py:func:`.Graph`
 
     >>> conditions = {
     ...     #'nodes': ['node_id1', 'node_id2', 'node_id3', ...]
-    ...     'date': set(
-    ...             (datetime.date(2010,1,1) + datetime.timedelta(days=x)).isoformat() 
-    ...             for x in range(30)  # get 30 days comments starting from 2010-01-01
-    ...         ), 
     ...     'opinion': set(['pos-pos', 'pos-neg', 'pos-neu', 'neg-pos', 'neg-neg', 'neg-neu'])
     ... }
-    >>> MG = MultiGraph(edge_condition=conditions, boards=['Boy-Girl'] ,years=[2007, 2008, 2009])
+    >>> # 30 days of comments starting from 2010-01-01 (years inferred)
+    >>> MG = MultiGraph(edge_condition=conditions, boards=['Boy-Girl'], years='all', start='2010-01-01', end='2010-01-30')
     >>> 
     >>> criteria = {
     ...     'opinion': ['pos-pos', 'neg-neg'],
@@ -72,28 +97,27 @@ def Graph(count_edges_in, edge_condition=None, MG=None, years=[], boards=[], nod
 
     Alternatively, directly create a ``networkx.Graph`` from reading disk file:
 
-    >>> G = Graph(edge_condition=conditions, count_edges_in=criteria)
+    >>> G = Graph(edge_condition=conditions, count_edges_in=criteria, boards=['Boy-Girl'], years='all', start='2010-01-01', end='2010-01-30')
     """
 
     if MG is None:
-        MG = MultiGraph(edge_condition, years, boards, node_path, edge_path)
-
-    G = nx.Graph()
+        if cache is not None:
+            fps = _edge_files(boards, years, edge_path, EdgeCondition(edge_condition, start, end))
+            key = cache.key(files=_source_files(fps, node_path), kind='Graph', count_edges_in=count_edges_in, edge_condition=edge_condition, 
+                            years=years, boards=boards, node_path=node_path, start=start, end=end)
+            G = cache.get(key)
+            if G is not None:
+                return G
+        MG = MultiGraph(edge_condition, years, boards, node_path, edge_path, cache=cache, start=start, end=end)
+    else:
+        cache = None
+
+    G = nx.Graph(posts=MG.graph.get('posts'))
+    condition = EdgeCondition(post_condition(count_edges_in, MG.graph.get('posts')), start, end)
     for n1, n2, attr in MG.edges(data=True, keys=False):
         
         # Reduce Graph to only relevent attributes
-        skip = False
-        for k, v in count_edges_in.items():
-            # check node conditions
-            if k == 'nodes':
-                if sum(1 for n in v if n in {n1.id, n2.id}) == 0: 
-                    skip = True
-                    break
-            # Skip if no specified nodes present in edge
-            elif attr[k] not in v:
-                skip = True
-                break
-        if skip: continue
+        if not condition(n1.id, n2.id, attr): continue
 
         # use edge weight
         if not G.has_edge(n1, n2):
@@ -101,77 +125,312 @@ def Graph(count_edges_in, edge_condition=None, MG=None, years=[], boards=[], nod
         else:
             G[n1][n2]['weight'] += 1
             G[n1][n2]['corpus'].append(attr)
+
+    if cache is not None:
+        cache.put(key, G)
     
     return G
 
 
-def MultiGraph(edge_condition, years=[y + 2006 for y in range(7)], boards=['Boy-Girl'], node_path="data/network/nodes", edge_path='data/network/edges'):
+def MultiGraph(edge_condition=None, years=[y + 2006 for y in range(7)], boards=['Boy-Girl'], node_path="data/network/nodes", edge_path='data/network/edges', cache=None, start=None, end=None):
     """Generate nx.Graph from PTT comment data
     
     Parameters
     ----------
     edge_condition : dict
         See ``edge_condition`` in :py:func:`.Graph`.
+    years : list or str, optional
+        Years of the edge files to load, by default 2006 to 2012. ``'all'``
+        loads all years with an edge file in ``edge_path`` (within 
+        ``start`` and ``end``).
+    boards : list or str, optional
+        Boards of the edge files to load, by default ['Boy-Girl'].
+        ``'all'`` loads all boards with an edge file in ``edge_path``.
     node_path : str, optional
         [description], by default "all_nodes.pkl"
     edge_path : str, optional
         [description], by default "all_edges.jsonl"
+    cache : GraphCache, optional
+        Cache of built graphs (see :py:class:`pttnet.cache.GraphCache`).
+        The graph is loaded from the cache if it was built before with 
+        the same parameters and unchanged source files. By default None.
+    start : str or datetime.date, optional
+        First date of the edges to load, by default None (no limit)
+    end : str or datetime.date, optional
+        Last date (inclusive) of the edges to load, by default None (no limit)
     
     Returns
     -------
     nx.MultiGraph
         Undirected graph allowing multiple edges between 
-        any pair of nodes.
+        any pair of nodes. Edges have the attributes ``date``, 
+        ``opinion`` and ``text`` (post id). The metadata of the posts
+        are in ``G.graph['posts']`` (a :py:class:`pttnet.preprocess.PostTable`,
+        or None for edge files written with the metadata on every edge).
+
+    Notes
+    -----
+    When edges are filtered by date (``start``, ``end`` or ``'date'`` in
+    ``edge_condition``), only the parts of the edge files with matching
+    dates are read, using a date index saved next to each edge file
+    (see :py:func:`.edge_date_index`).
     """
 
+    condition = EdgeCondition(edge_condition, start, end)
+
     # Get edge files' paths
-    fps = []
-    for board, year in [(b, str(y)) for b in boards for y in years]:
-        fp = os.path.join(edge_path, f"{board}_{year}_edges.jsonl")
-        if not os.path.exists(fp):
-            raise Exception(f"Edge file `{fp}` doesn't exist!")
-        fps.append(fp)
+    fps = _edge_files(boards, years, edge_path, condition)
+    posts = load_posts(fps)
+    condition = EdgeCondition(post_condition(edge_condition, posts), start, end)
+
+    if cache is not None:
+        key = cache.key(files=_source_files(fps, node_path), kind='MultiGraph', edge_condition=edge_condition, 
+                        years=years, boards=boards, node_path=node_path, start=start, end=end)
+        G = cache.get(key)
+        if G is not None:
+            return G
     
     # Create nx.Graph
-    G = nx.MultiGraph()
+    G = nx.MultiGraph(posts=posts)
 
     nodes = {}
     for fp in fps:
         # Loop over edges in a file
+        for line in _read_edges(fp, condition):
+            ed = json.loads(line)
+
+            # Check conditions
+            if not condition(ed['edge'][0], ed['edge'][1], ed['attr']): continue
+
+            # Load nodes
+            for node_id in ed['edge']:
+                if node_id not in nodes:
+                    nodes[node_id] = Node(node_id, from_disk=node_path)
+            
+            # Save valid edge
+            G.add_edge(nodes[ed['edge'][0]], nodes[ed['edge'][1]], **ed['attr'])
+
+    if cache is not None:
+        cache.put(key, G)
+
+    return G
+
+
+def load_posts(fps):
+    """Metadata of the posts of edge files
+
+    Parameters
+    ----------
+    fps : list
+        Paths of edge files (``<board>_<year>_edges.jsonl``).
+
+    Returns
+    -------
+    PostTable
+        Posts read from the posts files (``<board>_<year>_posts.jsonl``) 
+        of the edge files, or None if none of the edge files has a posts
+        file (edge files written with the metadata on every edge).
+
+    Raises
+    ------
+    Exception
+        If only some of the edge files have posts files, since conditions
+        on post metadata can't be checked on both kinds of edges.
+    """
+
+    paths = [_posts_file(fp) for fp in fps]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if len(missing) == len(paths):
+        return None
+    if missing:
+        raise Exception(f"Posts files {missing} don't exist! Rerun `comment2edges.py` for these edge files.")
+    return PostTable.load(*paths)
+
+
+def post_condition(condition, posts):
+    """Replace conditions on post metadata with a condition on post ids (``text``)"""
+
+    keys = [k for k in POST_ATTRS if k in (condition or {})]
+    if posts is None or not keys:
+        return condition
+
+    # Rows of the posts matching all conditions
+    rows = range(len(posts))
+    for k in keys:
+        if k == 'isRe':
+            values = set(condition[k])
+            rows = [r for r in rows if posts.isRe[r] in values]
+        else:
+            codes = {posts._lookup[k][v] for v in condition[k] if v in posts._lookup[k]}
+            rows = [r for r in rows if posts.codes[k][r] in codes]
+    ids = {posts.ids[r] for r in rows}
+
+    out = {k: v for k, v in condition.items() if k not in keys}
+    out['text'] = ids & set(condition['text']) if 'text' in condition else ids
+    return out
+
+
+def _edge_files(boards, years, edge_path, condition=None):
+    """Paths of the edge files of ``boards`` and ``years``, inferring them from ``edge_path`` if ``'all'``"""
+
+    # Year range of the date condition
+    first, last = 1, 9999
+    if condition is not None and condition.date_range is not None:
+        first, last = (datetime.date.fromordinal(d).year for d in condition.date_range)
+    elif condition is not None and condition.dates is not None:
+        years_ = {datetime.date.fromordinal(d).year for d in condition.dates} or {0}
+        first, last = min(years_), max(years_)
+
+    if boards == 'all' or years == 'all':
+        found = [f[:-len('_edges.jsonl')].rsplit('_', 1) for f in sorted(os.listdir(edge_path)) if f.endswith('_edges.jsonl')]
+        if boards == 'all':
+            boards = list(dict.fromkeys(b for b, _ in found))
+        if years == 'all':
+            # Years with an edge file, for each board
+            pairs = [(b, y) for b in boards for y in sorted({int(y) for b_, y in found if b_ == b and y.isdigit()})]
+    if years != 'all':
+        pairs = [(b, y) for b in boards for y in years]
+
+    fps = []
+    for board, year in pairs:
+        if not first <= int(year) <= last: continue
+        fp = os.path.join(edge_path, f"{board}_{year}_edges.jsonl")
+        if not os.path.exists(fp):
+            raise Exception(f"Edge file `{fp}` doesn't exist!")
+        fps.append(fp)
+    return fps
+
+
+def _source_files(fps, node_path):
+    """Files a graph is built from: edge files, their posts files and the node directory
+
+    The manifest of the node directory is rewritten whenever comments are
+    added to the node files, so it stands for all of them.
+    """
+
+    posts = [p for p in map(_posts_file, fps) if os.path.exists(p)]
+    manifest = os.path.join(node_path, NODE_MANIFEST)
+    return fps + posts + [node_path] + ([manifest] if os.path.exists(manifest) else [])
+
+
+def _posts_file(fp):
+    return fp[:-len('_edges.jsonl')] + '_posts.jsonl'
+
+
+def _read_edges(fp, condition):
+    """Lines of an edge file, skipping the parts with dates not in ``condition``"""
+
+    if not condition.filters_dates:
         with open(fp) as f:
+            yield from f
+        return
+
+    # Merge adjacent byte ranges of matching dates
+    ranges = []
+    for date, start, end in edge_date_index(fp):
+        if not condition.checkDate(date): continue
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
 
+    with open(fp, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
             for line in f:
-                ed = json.loads(line)
-
-                # Check conditions
-                skip = False
-                for k, v in edge_condition.items():
-                    # Skip if no specified nodes present in edge
-                    if k == 'nodes':
-                        if sum(1 for n in v if n in ed['edge']) == 0: 
-                            skip = True
-                            break
-                    
-                    # Skip if edge attributes don't matched specified conditions
-                    elif ed['attr'][k] not in v:
-                        skip = True
-                        break
-                if skip: continue
-
-                # Load nodes
-                for node_id in ed['edge']:
-                    if node_id not in nodes:
-                        nodes[node_id] = Node(node_id, from_disk=node_path)
-                
-                # Save valid edge
-                G.add_edge(nodes[ed['edge'][0]], nodes[ed['edge'][1]], **ed['attr'])
+                yield line.decode('utf-8')
+                start += len(line)
+                if start >= end: break
 
-    return G
 
+def edge_date_index(fp):
+    """Date index of an edge file
+
+    Edges of a post are written together, so an edge file consists of 
+    runs of edges with the same date. The runs are saved in a sidecar 
+    file (``<board>_<year>_edges.index.json``), which is rebuilt when the
+    edge file changes. If the sidecar can't be written (e.g., a read-only
+    data directory), the index is kept in memory for the process instead.
+
+    Parameters
+    ----------
+    fp : str
+        Path to the edge file.
+
+    Returns
+    -------
+    list
+        ``[date, start, end]`` of each run, with the date as day ordinal
+        and the run's byte range in the edge file.
+    """
+
+    idx_fp = fp[:-len('.jsonl')] + '.index.json'
+    st = os.stat(fp)
+    memo = (os.path.abspath(fp), st.st_size, st.st_mtime_ns)
+    if memo in _DATE_INDEXES:
+        return _DATE_INDEXES[memo]
+    if os.path.exists(idx_fp):
+        with open(idx_fp) as f:
+            index = json.load(f)
+        if index['size'] == st.st_size and index['mtime_ns'] == st.st_mtime_ns:
+            return index['runs']
+
+    runs = []
+    pos = 0
+    with open(fp, 'rb') as f:
+        for line in f:
+            date = iso2ord(json.loads(line)['attr']['date'])
+            if runs and runs[-1][0] == date:
+                runs[-1][2] = pos + len(line)
+            else:
+                runs.append([date, pos, pos + len(line)])
+            pos += len(line)
+
+    try:
+        with open(idx_fp + '.tmp', 'w') as f:
+            json.dump({'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'runs': runs}, f)
+        os.replace(idx_fp + '.tmp', idx_fp)
+    except OSError:
+        _DATE_INDEXES[memo] = runs
+    return runs
+
+
+
+class Comment():
+
+    __slots__ = ('type', 'content', 'board', 'ord', 'src')
+
+    def __init__(self, type, content, board, ord, src):
+        """A comment in the corpus of a :py:class:`.Node`
+
+        Saved as a dict with the same keys in node files. Comment types 
+        and board names are interned, so that all comments share a 
+        handful of strings.
+        """
+
+        self.type = sys.intern(type)
+        self.content = content
+        self.board = sys.intern(board)
+        self.ord = ord
+        self.src = src
+
+    def __repr__(self):
+        return f"<Comment, {self.type}, board: {self.board}, src: {self.src}>"
+
+    def to_dict(self):
+        return {
+            "type": self.type,
+            "content": self.content,
+            "board": self.board,
+            "ord": self.ord,
+            "src": self.src
+        }
 
 
 class Node():
 
+    __slots__ = ('id', 'corpus', 'corpus_stats', 'vocab')
+
     def __init__(self, id_: str, from_disk: str=None):
         """Initialize a node object
         
@@ -197,6 +456,16 @@ class Node():
     def __repr__(self):
         return f"<Node, node_id: {self.id}>"
 
+    def __setstate__(self, state):
+        # Pickles from before `__slots__` hold the `__dict__`, with dict comments
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        for k, v in state.items():
+            setattr(self, k, v)
+        for day, cmts in self.corpus.items():
+            if cmts and isinstance(cmts[0], dict):
+                self.corpus[day] = [Comment(**c) for c in cmts]
+
     def __eq__(self, that):
         return self.id == that.id
         
@@ -221,9 +490,12 @@ class Node():
         self.corpus_stats = node['corpus_stats']
         self.vocab = node['vocab']
 
-        # Load corpus
+        # Load corpus, merging the days written by each save
+        self.corpus = {}
         with open(fp_corp) as f:
-            self.corpus = merge_dicts(json.loads(l) for l in f)
+            for l in f:
+                for day, cmts in json.loads(l).items():
+                    self.corpus.setdefault(day, []).extend(Comment(**c) for c in cmts)
 
 
     def _saveNode(self, dir_="data/network/nodes"):
@@ -240,7 +512,7 @@ class Node():
                 }, f, ensure_ascii=False)
             
         with open(fp_corp, "a") as f:
-            f.write(json.dumps(self.corpus, ensure_ascii=False))
+            f.write(json.dumps(self.corpus, ensure_ascii=False, default=Comment.to_dict))
             f.write('\n')
 
 
@@ -278,12 +550,8 @@ class Node():
 
             {
               '2019-01-20': [
-                {   
-                  'type': "pos",
-                  'board': "Boy-Girl",
-                  'content': "segmented string"
-                },
-                {...}
+                Comment(type="pos", content="segmented string", board="Boy-Girl", ord=3, src="M.1548000000.A.123.json"),
+                ...
               ],
               '2020-01-20': [...],
               ...
@@ -293,13 +561,7 @@ class Node():
         if self.corpus.get(date) is None:
             self.corpus[date] = []
         
-        self.corpus[date].append({
-            "type": type_,
-            "content": content,
-            "board": board,
-            "ord": ord_,
-            "src": src
-        })
+        self.corpus[date].append(Comment(type_, content, board, ord_, src))
 
 
     def getCorpusStats(self, start="1900-01-01", end="2050-12-31", boards=None, force=False):
@@ -362,10 +624,7 @@ class Node():
             }
         """
 
-        if boards is not None:
-            key = f"{start}_{end}_{'-'.join(b for b in boards)}"
-        else:
-            key = f"{start}_{end}"
+        key = corpus_key(start, end, boards)
         
         # Return cache
         if not force and self.corpus_stats.get(key) is not None:
@@ -389,32 +648,30 @@ class Node():
 
         # Compute corpus stats
         tokens = []
+        start_d, end_d = iso2ord(start), iso2ord(end)
         for day, corp in self.corpus.items():
             
             # Check date
-            start_d = datetime.date.fromisoformat(start)
-            end_d = datetime.date.fromisoformat(end)
-            day = datetime.date.fromisoformat(day)
-            if not (start_d <= day and day <= end_d): continue
+            if not (start_d <= iso2ord(day) <= end_d): continue
 
             for cmt in corp:
                 # Check boards
                 if boards is not None:
-                    if cmt['board'] in boards: 
+                    if cmt.board in boards: 
                         # Update stats
-                        stats['count-' + cmt['type']] += 1
-                        stats['chars-' + cmt['type']] += len(''.join(cmt['content'].split()))
-                        tks = cmt['content'].replace('\n', '\u3000').split('\u3000')
-                        stats['tokens-' + cmt['type']] += len(tks)
+                        stats['count-' + cmt.type] += 1
+                        stats['chars-' + cmt.type] += len(''.join(cmt.content.split()))
+                        tks = cmt.content.replace('\n', '\u3000').split('\u3000')
+                        stats['tokens-' + cmt.type] += len(tks)
                         tokens += tks
                 
                 # Without boards
                 else:
                     # Update stats
-                    stats['count-' + cmt['type']] += 1
-                    stats['chars-' + cmt['type']] += len(''.join(cmt['content'].split()))
-                    tks = cmt['content'].replace('\n', '\u3000').split('\u3000')
-                    stats['tokens-' + cmt['type']] += len(tks)
+                    stats['count-' + cmt.type] += 1
+                    stats['chars-' + cmt.type] += len(''.join(cmt.content.split()))
+                    tks = cmt.content.replace('\n', '\u3000').split('\u3000')
+                    stats['tokens-' + cmt.type] += len(tks)
                     tokens += tks
         
         # Get *-all stats
@@ -437,6 +694,13 @@ class Node():
 
         return stats, vocab
 
+def corpus_key(start="1900-01-01", end="2050-12-31", boards=None):
+    """Key of the corpus stats and vocabulary of a date range and boards in :py:class:`.Node`"""
+
+    if boards is not None:
+        return f"{start}_{end}_{'-'.join(sorted(boards))}"
+    return f"{start}_{end}"
+
 '''
 def load_Nodes(path="data/network/nodes"):
     node_ids = { f[:-11] for f in os.listdir("data/network/nodes") }
@@ -457,18 +721,15 @@ if __name__ == "__main__":
     conditions = {
         #'title': {'她答應了!她答應了!'},
         #'tag': {'心情'}
-        'date': set((datetime.date(2010,1,1) + datetime.timedelta(days=x)).isoformat() \
-            for x in range(30)),
         #'board': {"Boy-Girl"},
         #'opinion': {'pos-pos', 'pos-neg', 'pos-neu', 'neg-pos', 'neg-neg', 'neg-neu', 'neu-pos', 'neu-neg', 'neu-neu'}
     }
     count_edges_in = {
         'opinion': ['pos-pos', 'neg-neg'], 
-        'date': set((datetime.date(2003,1,1) + datetime.timedelta(days=x)).isoformat() for x in range(20*365))
     }
 
     s = time()
-    MG = loadMGraph(edge_condition=conditions)
+    MG = MultiGraph(edge_condition=conditions, years='all', start='2010-01-01', end='2010-01-30')
     #G = Graph(count_edges_in=count_edges_in, MG=MG)
     end = time() - s
     print(end)
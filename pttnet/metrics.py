@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import logging
+import weakref
+import threading
+import contextlib
+from time import perf_counter
+from datetime import datetime
+
+
+class Metrics():
+
+    def __init__(self, name, path=None, profile=None, trace_memory=None, sample_interval=0.2):
+        """Stage timers and counters of a pipeline run, saved as JSON
+
+        Each stage records its wall time, peak resident memory (sampled
+        in a background thread), bytes read and written (Linux only, from
+        ``/proc/self/io``) and the counters incremented while it runs.
+        Optionally, top-level stages are profiled with ``cProfile`` and/or
+        their allocations are traced with ``tracemalloc``.
+
+        Parameters
+        ----------
+        name : str
+            Name of the run, e.g., ``comment2edges_Gossiping_2015``.
+        path : str, optional
+            JSON file to save the metrics to, by default ``<name>_metrics.json``
+        profile : bool, optional
+            Profile stages with ``cProfile``, saving the statistics to
+            ``<name>_<stage>.prof``. By default None: enabled if the
+            ``PTTNET_PROFILE`` environment variable is set.
+        trace_memory : bool, optional
+            Trace allocations with ``tracemalloc`` and record the peak
+            traced memory and top allocating lines of each stage. By
+            default None: enabled if ``PTTNET_TRACEMALLOC`` is set.
+        sample_interval : float, optional
+            Seconds between memory samples, by default 0.2
+
+        Examples
+        --------
+        >>> metrics = Metrics(f'comment2edges_{BOARD}_{YEAR}')
+        >>> with metrics.stage('edges'):
+        ...     for post in posts:
+        ...         metrics.count('posts')
+        ...         metrics.count('comments', len(post['comments']))
+        >>> metrics.save()
+        """
+
+        self.name = name
+        self.path = f"{name}_metrics.json" if path is None else path
+        self.profile = bool(os.environ.get('PTTNET_PROFILE')) if profile is None else profile
+        self.trace_memory = bool(os.environ.get('PTTNET_TRACEMALLOC')) if trace_memory is None else trace_memory
+        self.sample_interval = sample_interval
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.start = perf_counter()
+        self.stages = []        # records of finished stages
+        self._active = []       # records of running stages, innermost last
+        self._sampler = None
+        self._stop = None
+
+
+    def __repr__(self):
+        return f"<Metrics {self.name}, stages: {[s['stage'] for s in self.stages]}>"
+
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a stage of the run (stages can be nested)"""
+
+        record = {
+            'stage': name,
+            'parent': self._active[-1]['stage'] if self._active else None,
+            'started': datetime.now().isoformat(timespec='seconds'),
+            'counters': {},
+        }
+        io0 = _io_counters()
+        record['peak_rss'] = current_rss()
+        top = not self._active
+        self._active.append(record)
+        self._startSampler()
+
+        if self.profile and top:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        if self.trace_memory and top:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if hasattr(tracemalloc, 'reset_peak'):  # Python >= 3.9
+                tracemalloc.reset_peak()
+            snapshot0 = tracemalloc.take_snapshot()
+
+        s = perf_counter()
+        try:
+            yield record
+        finally:
+            record['secs'] = perf_counter() - s
+
+            if self.trace_memory and top:
+                record['traced_peak'] = tracemalloc.get_traced_memory()[1]
+                stats = tracemalloc.take_snapshot().compare_to(snapshot0, 'lineno')
+                record['top_allocations'] = [
+                    {'line': str(st.traceback), 'size_diff': st.size_diff, 'count_diff': st.count_diff}
+                    for st in stats[:10]
+                ]
+            if self.profile and top:
+                profiler.disable()
+                record['profile'] = f"{self.name}_{name}.prof"
+                profiler.dump_stats(record['profile'])
+
+            io1 = _io_counters()
+            if io0 is not None and io1 is not None:
+                record['bytes_read'] = io1['rchar'] - io0['rchar']
+                record['bytes_written'] = io1['wchar'] - io0['wchar']
+            record['peak_rss'] = max(record['peak_rss'], current_rss())
+            self._active.remove(record)
+            if not self._active:
+                self._stopSampler()
+            self.stages.append(record)
+            logging.info(f"[{name}] {record['secs']:.2f} secs, peak RSS {record['peak_rss'] / 1024**2:.1f} MiB, {record['counters']}")
+
+
+    def count(self, counter, n=1):
+        """Increment a counter of the running stages"""
+        for record in self._active:
+            record['counters'][counter] = record['counters'].get(counter, 0) + n
+
+
+    def _startSampler(self):
+        if self._sampler is not None: return
+
+        def sample(stop):
+            while not stop.wait(self.sample_interval):
+                rss = current_rss()
+                for record in list(self._active):
+                    if rss > record['peak_rss']:
+                        record['peak_rss'] = rss
+
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=sample, args=(self._stop,), daemon=True)
+        self._sampler.start()
+        _SAMPLING.add(self)
+
+    def _stopSampler(self):
+        """Stop the memory sampler, when the outermost stage exits or before a fork"""
+        if self._sampler is None: return
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = self._stop = None
+        _SAMPLING.discard(self)
+
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'argv': sys.argv,
+            'started': self.started,
+            'secs': perf_counter() - self.start,
+            'max_rss': max_rss(),
+            'stages': self.stages,
+        }
+
+    def save(self, path=None):
+        """Write the metrics to a JSON file"""
+        data = self.to_dict()
+        with open(self.path if path is None else path, 'w') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        logging.info(f"Finished in {data['secs']:.2f} secs, peak RSS {data['max_rss'] / 1024**2:.1f} MiB")
+
+
+# Metrics with a running sampler. Samplers are stopped while the process
+# forks (e.g., multiprocessing pools started inside a stage), and restarted after.
+_SAMPLING = weakref.WeakSet()
+_PAUSED = []
+
+def _before_fork():
+    _PAUSED[:] = list(_SAMPLING)
+    for m in _PAUSED:
+        m._stopSampler()
+
+def _after_fork_in_parent():
+    for m in _PAUSED:
+        if m._active:
+            m._startSampler()
+    _PAUSED.clear()
+
+def _after_fork_in_child():
+    _PAUSED.clear()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_before_fork, after_in_parent=_after_fork_in_parent, after_in_child=_after_fork_in_child)
+
+
+def current_rss():
+    """Resident memory of the process in bytes (falls back to the peak, if not available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return max_rss()
+
+
+def max_rss():
+    """Peak resident memory of the process in bytes"""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def _io_counters():
+    try:
+        with open('/proc/self/io') as f:
+            return {k: int(v) for k, v in (line.split(':') for line in f)}
+    except (OSError, ValueError):
+        return None
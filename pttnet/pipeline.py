@@ -0,0 +1,405 @@
+import os
+import json
+import logging
+import concurrent.futures
+from pttnet import graph
+from pttnet import stages
+from pttnet.metrics import Metrics
+
+
+DEFAULT_CONFIG = {
+    'boards': ['Gossiping'],
+    'years': ['2015'],
+    'jobs': os.cpu_count() or 1,        # Tasks run at once
+    'stage_jobs': {'segment': 1},       # Tasks of a stage run at once (default: `jobs`)
+    'triads_jobs': 1,                   # Processes of a triad enumeration task (-1: all CPUs)
+    'segment': False,                   # Segment the corpus, and build networks from the segmented corpus
+    'corpus_dir': 'data/corpus/',
+    'segmented_dir': 'data/corpus/segmented/',
+    'edge_dir': 'data/network/edges',
+    'node_dir': 'data/network/nodes',
+    'signed_dir': 'data/signed_network/',
+    'log_dir': 'logs',
+    'state_file': 'data/pipeline_state.json',
+    'ckip_data': '../ckiptagger/data',
+    'word_list': 'data/word_list/all',
+    'disable_cuda': True,
+    'gml_sample': 0,
+    'batch_size': 100000,
+}
+
+
+def load_config(path=None, **overrides):
+    """Pipeline configuration: defaults, updated by a JSON file and by ``overrides`` that are not None"""
+
+    config = dict(DEFAULT_CONFIG)
+    if path is not None:
+        with open(path) as f:
+            config.update(json.load(f))
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    config['years'] = [str(y) for y in config['years']]
+    if config['jobs'] < 1:
+        config['jobs'] = os.cpu_count() or 1
+    _check_config(config)
+    return config
+
+
+def _check_config(config):
+    for name, n in config['stage_jobs'].items():
+        if name not in STAGE_NAMES:
+            raise ValueError(f"Unknown stage `{name}` in `stage_jobs`")
+        if not isinstance(n, int) or n < 1:
+            raise ValueError(f"`stage_jobs` of `{name}` must be at least 1, got {n!r}")
+
+
+def network_corpus(config):
+    """Corpus directory the networks are built from"""
+    return config['segmented_dir'] if config['segment'] else config['corpus_dir']
+
+
+class Stage():
+
+    def __init__(self, name, run, unit, inputs, outputs, deps=(), params=(), enabled=None, in_parent=None, contents=None):
+        """A step of the pipeline, run as independent tasks
+
+        Parameters
+        ----------
+        name : str
+            Stage name
+        run : callable
+            ``run(config, boards, years, metrics)``, runs a task.
+        unit : str
+            Scope of a task. ``'year'``: one task per board and year,
+            ``'board'``: one task per board (all years), ``'all'``: a
+            single task.
+        inputs, outputs : callable
+            ``f(config, boards, years)``, paths of the files or
+            directories read and written by a task.
+        deps : tuple, optional
+            Names of the stages whose outputs are read. A task waits for
+            the tasks of these stages with overlapping boards and years.
+        params : tuple, optional
+            Config keys the outputs depend on. Changing them makes the
+            outputs out of date.
+        enabled : callable, optional
+            ``f(config)``, whether the stage is part of the pipeline.
+            By default None (always).
+        in_parent : callable, optional
+            ``f(config)``, whether tasks run in the main process instead
+            of a worker, e.g., because they start a process pool of their
+            own. By default None (never).
+        contents : callable, optional
+            ``f(config)``, ``(board, year)`` pairs in the outputs, for 
+            stages whose outputs are shared by tasks of different boards.
+            A task is only up to date if its pairs are in the outputs.
+            By default None (outputs are not shared).
+        """
+
+        self.name = name
+        self.run = run
+        self.unit = unit
+        self.inputs = inputs
+        self.outputs = outputs
+        self.deps = deps
+        self.params = params
+        self.enabled = enabled
+        self.in_parent = in_parent
+        self.contents = contents
+
+    def __repr__(self):
+        return f"<Stage {self.name}, unit: {self.unit}, deps: {list(self.deps)}>"
+
+    def tasks(self, config):
+        boards, years = config['boards'], config['years']
+        if self.unit == 'year':
+            return [Task(self, [b], [y]) for b in boards for y in years]
+        if self.unit == 'board':
+            return [Task(self, [b], years) for b in boards]
+        return [Task(self, boards, years)]
+
+
+class Task():
+
+    def __init__(self, stage, boards, years):
+        self.stage = stage
+        self.boards = boards
+        self.years = years
+        self.pairs = {(b, y) for b in boards for y in years}
+        self.id = f"{stage.name}_{'+'.join(boards)}_{'.'.join(years)}"
+
+    def __repr__(self):
+        return f"<Task {self.id}>"
+
+    def params(self, config):
+        return {
+            'boards': self.boards,
+            'years': self.years,
+            'corpus': network_corpus(config),
+            **{k: config[k] for k in self.stage.params}
+        }
+
+    def up_to_date(self, config, state):
+        """Whether the outputs exist, are newer than the inputs and were built with the current parameters"""
+
+        if state.get(self.id) != self.params(config):
+            return False
+        if self.stage.contents is not None and not self.pairs <= self.stage.contents(config):
+            return False
+        outputs = self.stage.outputs(config, self.boards, self.years)
+        if not all(os.path.exists(p) for p in outputs):
+            return False
+        return _mtime(outputs, min) >= _mtime(self.stage.inputs(config, self.boards, self.years), max)
+
+
+def _mtime(paths, reduce):
+    """Newest (``reduce=max``) or oldest (``min``) modification time of files, recursing into directories"""
+
+    mtimes = []
+    for p in paths:
+        if not os.path.exists(p):
+            mtimes.append(float('inf') if reduce is max else float('-inf'))
+        elif os.path.isdir(p):
+            for root, _, files in os.walk(p):
+                mtimes.extend(os.stat(os.path.join(root, f)).st_mtime for f in files)
+        else:
+            mtimes.append(os.stat(p).st_mtime)
+    return reduce(mtimes) if mtimes else (float('-inf') if reduce is max else float('inf'))
+
+
+#-------------- Stages --------------#
+def _corpus_dirs(config, boards, years, base=None):
+    base = network_corpus(config) if base is None else base
+    return [os.path.join(base, b, y) for b in boards for y in years]
+
+def _signed_data(config, boards, years, name):
+    return [os.path.join(config['signed_dir'], name.format(board=b, years='.'.join(years))) for b in boards]
+
+
+def _segment(config, boards, years, metrics):
+    for b in boards:
+        for y in years:
+            stages.segment(b, y, config['corpus_dir'], config['segmented_dir'], config['ckip_data'], config['word_list'], config['disable_cuda'], metrics)
+
+def _edges(config, boards, years, metrics):
+    for b in boards:
+        stages.comment2edges(b, years, network_corpus(config), config['edge_dir'], metrics)
+
+def _nodes(config, boards, years, metrics):
+    # Node files are shared by all boards. Comments are appended to them, so
+    # new boards and years are appended, but rebuilding any board and year
+    # already in the files means rebuilding all of them from scratch.
+    node_dir = config['node_dir']
+    pairs = {(b, y) for b in boards for y in years}
+    built = stages.node_pairs(node_dir) | _state_pairs(config, 'nodes')
+    if not pairs.isdisjoint(built) or (not built and _node_files(node_dir)):
+        for f in _node_files(node_dir):
+            os.remove(os.path.join(node_dir, f))
+        pairs |= built
+
+    for b in sorted({b for b, _ in pairs}):
+        stages.comment2nodes(b, sorted(y for b_, y in pairs if b_ == b), network_corpus(config), node_dir, metrics)
+
+def _node_files(node_dir):
+    if not os.path.exists(node_dir):
+        return []
+    return [f for f in os.listdir(node_dir) if f.endswith('-stats.json') or f.endswith('-corp.jsonl') or f == graph.NODE_MANIFEST]
+
+def _state_pairs(config, stage):
+    """``(board, year)`` pairs of the finished tasks of a stage, from the state file"""
+    if not os.path.exists(config['state_file']):
+        return set()
+    with open(config['state_file']) as f:
+        state = json.load(f)
+    return {(b, y) for id_, p in state.items() if id_.split('_', 1)[0] == stage for b in p['boards'] for y in p['years']}
+
+def _signed(config, boards, years, metrics):
+    for b in boards:
+        stages.signed_network_extraction(b, years, network_corpus(config), config['signed_dir'], metrics)
+
+def _triads(config, boards, years, metrics):
+    for b in boards:
+        stages.theory_of_status(b, years, config['signed_dir'], config['triads_jobs'], metrics)
+
+def _status(config, boards, years, metrics):
+    for b in boards:
+        stages.status_triangles(b, years, config['signed_dir'], config['gml_sample'], config['batch_size'], metrics=metrics)
+
+
+STAGES = [
+    Stage('segment', _segment, 'year',
+          inputs=lambda c, bs, ys: _corpus_dirs(c, bs, ys, c['corpus_dir']),
+          outputs=lambda c, bs, ys: _corpus_dirs(c, bs, ys, c['segmented_dir']),
+          params=('word_list',), enabled=lambda c: c['segment']),
+    # Posts are written to the edge file of their date's year, which may
+    # differ from their directory's year, so all years of a board are one task
+    Stage('edges', _edges, 'board', deps=('segment',),
+          inputs=_corpus_dirs,
+          outputs=lambda c, bs, ys: [f(c['edge_dir'], b, y) for b in bs for y in ys for f in (stages.edge_file, stages.post_file)]),
+    # Node files are shared by all boards and years
+    Stage('nodes', _nodes, 'all', deps=('segment',),
+          inputs=_corpus_dirs,
+          outputs=lambda c, bs, ys: [c['node_dir']],
+          contents=lambda c: stages.node_pairs(c['node_dir'])),
+    # The author index is shared by all years of a board
+    Stage('signed', _signed, 'board', deps=('segment',),
+          inputs=_corpus_dirs,
+          outputs=lambda c, bs, ys: _signed_data(c, bs, ys, 'edges_{years}_{board}') + _signed_data(c, bs, ys, 'nodes_{years}_{board}.pkl')),
+    Stage('triads', _triads, 'board', deps=('signed',),
+          inputs=lambda c, bs, ys: _signed_data(c, bs, ys, 'edges_{years}_{board}'),
+          outputs=lambda c, bs, ys: _signed_data(c, bs, ys, 'triangles_{years}_{board}'),
+          in_parent=lambda c: c['triads_jobs'] != 1),
+    Stage('status', _status, 'board', deps=('triads',),
+          inputs=lambda c, bs, ys: _signed_data(c, bs, ys, 'triangles_{years}_{board}'),
+          outputs=lambda c, bs, ys: _signed_data(c, bs, ys, 'triangles_{years}_{board}_status.json'),
+          params=('gml_sample',)),
+]
+STAGE_NAMES = [s.name for s in STAGES]
+
+
+def plan(config, names=None):
+    """Tasks of the enabled stages (all, or ``names``), with their dependencies"""
+
+    tasks = [
+        t for s in STAGES
+        if (names is None or s.name in names) and (s.enabled is None or s.enabled(config))
+        for t in s.tasks(config)
+    ]
+    for t in tasks:
+        t.deps = [d for d in tasks if d.stage.name in t.stage.deps and d.pairs & t.pairs]
+    return tasks
+
+
+def _run_task(name, boards, years, config, task_id):
+    """Run a task in a worker process, logging to ``<log_dir>/<task_id>.log``"""
+
+    os.makedirs(config['log_dir'], exist_ok=True)
+    handler = logging.FileHandler(os.path.join(config['log_dir'], f'{task_id}.log'), mode='w')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s', datefmt='%Y/%m/%d %I:%M:%S'))
+    logger = logging.getLogger()
+    level = logger.level
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    try:
+        metrics = Metrics(task_id, path=os.path.join(config['log_dir'], f'{task_id}_metrics.json'))
+        stage = STAGES[STAGE_NAMES.index(name)]
+        stage.run(config, boards, years, metrics)
+        metrics.save()
+        return metrics.to_dict()['secs']
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+        handler.close()
+
+
+def _run_in_parent(t, config):
+    """Run a task in the main process, returning a finished future"""
+
+    fut = concurrent.futures.Future()
+    try:
+        fut.set_result(_run_task(t.stage.name, t.boards, t.years, config, t.id))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
+
+def run(config, names=None, force=False, dry_run=False, log=print):
+    """Run the pipeline
+
+    Tasks run in ``config['jobs']`` processes as soon as the tasks they
+    depend on finish. Tasks with up-to-date outputs are skipped (unless
+    ``force``), and tasks depending on a failed task are not run. Triad
+    enumeration tasks with ``triads_jobs`` other than 1 start their own
+    process pool, so they run in the main process, one at a time.
+
+    Parameters
+    ----------
+    config : dict
+        See :py:func:`.load_config`.
+    names : list, optional
+        Stages to run, by default None (all)
+    force : bool, optional
+        Run tasks even if their outputs are up to date, by default False
+    dry_run : bool, optional
+        Only report the tasks that would run, by default False
+    log : callable, optional
+        Progress messages are passed to this function, by default print
+
+    Returns
+    -------
+    dict
+        Task ids mapped to their status: ``'done'``, ``'up to date'``,
+        ``'would run'``, ``'failed'`` or ``'skipped'``.
+
+    Examples
+    --------
+    >>> config = load_config(boards=['Gossiping', 'HatePolitics'], years=['2014', '2015'], jobs=4)
+    >>> run(config, names=['edges', 'signed', 'triads', 'status'])
+    """
+
+    _check_config(config)
+    tasks = plan(config, names)
+    state = {}
+    if os.path.exists(config['state_file']):
+        with open(config['state_file']) as f:
+            state = json.load(f)
+
+    status = {}
+    ran = set()   # tasks run (or to be run, if dry_run)
+    pending = list(tasks)
+    running = {}
+    with concurrent.futures.ProcessPoolExecutor(config['jobs']) as pool:
+        while pending or running:
+            for t in list(pending):
+                if any(status.get(d.id) in ('failed', 'skipped') for d in t.deps):
+                    pending.remove(t)
+                    status[t.id] = 'skipped'
+                    log(f"[skipped] {t.id} (dependency failed)")
+                    continue
+                if any(d.id not in status for d in t.deps): continue
+
+                if force or any(d in ran for d in t.deps) or not t.up_to_date(config, state):
+                    if dry_run:
+                        ran.add(t)
+                        status[t.id] = 'would run'
+                    else:
+                        # Limit the number of tasks running at once
+                        if len(running) >= config['jobs']: break
+                        stage_limit = config['stage_jobs'].get(t.stage.name, config['jobs'])
+                        if sum(r.stage is t.stage for r in running.values()) >= stage_limit: continue
+                        log(f"[started] {t.id}")
+                        if t.stage.in_parent is not None and t.stage.in_parent(config):
+                            running[_run_in_parent(t, config)] = t
+                        else:
+                            running[pool.submit(_run_task, t.stage.name, t.boards, t.years, config, t.id)] = t
+                        ran.add(t)
+                else:
+                    status[t.id] = 'up to date'
+                pending.remove(t)
+                if t.id in status: log(f"[{status[t.id]}] {t.id}")
+
+            if not running: continue
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in finished:
+                t = running.pop(fut)
+                try:
+                    secs = fut.result()
+                except Exception as e:
+                    status[t.id] = 'failed'
+                    log(f"[failed] {t.id}: {e!r}")
+                    continue
+                status[t.id] = 'done'
+                log(f"[done] {t.id} in {secs:.1f} secs")
+
+                # Record the parameters of the outputs, forgetting tasks
+                # whose outputs were replaced
+                state[t.id] = t.params(config)
+                if t.stage.contents is not None:
+                    contents = t.stage.contents(config)
+                    for id_ in [id_ for id_ in state if id_ != t.id and id_.split('_', 1)[0] == t.stage.name]:
+                        if not {(b, y) for b in state[id_]['boards'] for y in state[id_]['years']} <= contents:
+                            del state[id_]
+                os.makedirs(os.path.dirname(config['state_file']) or '.', exist_ok=True)
+                with open(config['state_file'], 'w') as f:
+                    json.dump(state, f, ensure_ascii=False, indent=1)
+
+    return status
@@ -1,50 +1,181 @@
 import os
 import json
 import re
-from datetime import datetime
+from array import array
+from pttnet.utils import DayCache, ord2iso
 
-def load_comments_data_from_corpus(boards=["Gossiping"], years=[2009], basedir='data/corpus/segmented/', ext='.json'):
+# `Re: [tag] title`, with both prefixes optional
+TITLE_PATTERN = re.compile(r'(^Re: ?)?(\[(.+)\] ?)?(.*)')
+
+def load_comments_data_from_corpus(boards=["Gossiping"], years=[2009], basedir='data/corpus/segmented/', ext='.json', table=None):
     
-    posts = []
+    return list(iter_comments_data_from_corpus(boards, years, basedir, ext, table))
+
+
+def iter_comments_data_from_corpus(boards=["Gossiping"], years=[2009], basedir='data/corpus/segmented/', ext='.json', table=None):
+    """Stream posts from the corpus, one at a time
+
+    Same as :py:func:`.load_comments_data_from_corpus` without keeping 
+    all posts in memory. Posts are read in file name order, so that 
+    repeated runs see them in the same order.
+
+    If a :py:class:`.PostTable` is given, the posts' metadata are added 
+    to it, each post gets its row in the table as ``'post'``, and the 
+    title, tag, board and author strings are shared with the table.
+
+    Posts get their (local) date both as a day ordinal, ``'day'``, and 
+    as an isoformat string, ``'date'``.
+    """
+
+    to_day = DayCache()
 
     for board in boards:
         for year in years:
             fp = os.path.join(basedir, board, str(year))
 
-            for post_name in os.listdir(fp):
+            for post_name in sorted(os.listdir(fp)):
                 if not post_name.endswith(ext): continue
                 post_path = os.path.join(fp, post_name)
 
                 with open(post_path) as f:
                     data = json.load(f)
-                    title = titleProcess(data['post_title'])
+                    title, isRe, tag = parse_title(data['post_title'])
+                    day = to_day(int(data['post_time']))
 
-                    posts.append({
-                        'title': title['title'],
-                        'isRe': title['isRe'],
-                        'tag': title['tag'],
+                    post = {
+                        'title': title,
+                        'isRe': isRe,
+                        'tag': tag,
                         'id': post_name,
                         'board': board,
-                        'date': datetime.fromtimestamp(int(data['post_time'])).strftime("%Y-%m-%d"),
+                        'day': day,
+                        'date': ord2iso(day),
                         'author': data['post_author'],
                         'comments': data["comments"],
                         'content': data["post_body"],
-                    })
+                    }
+                    if table is not None:
+                        post['post'] = table.add(post)
+                        # Share the table's strings, without overwriting any field
+                        for k, v in table.record(post['post']).items():
+                            if post[k] == v:
+                                post[k] = v
+                    yield post
+
 
-    return posts
+def parse_title(title: str):
+    """Split a post title into ``(title, isRe, tag)``
+
+    Examples
+    --------
+    >>> parse_title('Re: [問卦] 有沒有八卦')
+    ('有沒有八卦', 1, '問卦')
+    """
+
+    m = TITLE_PATTERN.match(title)
+    return m[4], 0 if m[1] is None else 1, m[3]
 
 
 def titleProcess(title: str):
-    m = re.match('(^Re: ?)?(\[(.+)\] ?)?(.*)', title)
-    try:
-        out = {
-            'title': m[4],
-            'isRe': 0 if m[1] is None else 1,
-            'tag': m[3]
-        }
-    except:
-        raise Exception("RegEx parse error")
-    return out
+    title, isRe, tag = parse_title(title)
+    return {
+        'title': title,
+        'isRe': isRe,
+        'tag': tag
+    }
+
+
+class PostTable():
+
+    FIELDS = ('title', 'tag', 'board', 'author', 'date')
+
+    def __init__(self):
+        """Post metadata, with repeated strings interned to integer ids
+
+        Each post is a row: its id (file name), ``isRe`` and the ids of
+        its title, tag, board, author and date. The strings are kept 
+        once, in ``values``.
+
+        Examples
+        --------
+        >>> table = PostTable()
+        >>> posts = load_comments_data_from_corpus(['Gossiping'], [2015], table=table)
+        >>> table.record(posts[0]['post'])
+        {'id': '20150102_0119_M.1420164000.A.json', 'title': ..., 'isRe': 0, 'tag': ..., 'board': 'Gossiping', ...}
+        >>> table.save('Gossiping_2015_posts.jsonl')
+        """
+
+        self.ids = []                                      # post ids (file names)
+        self.index = {}                                    # (board, post id) -> row
+        self.isRe = array('b')
+        self.codes = {k: array('i') for k in self.FIELDS}  # field -> row -> value id
+        self.values = {k: [] for k in self.FIELDS}         # field -> value id -> value
+        self._lookup = {k: {} for k in self.FIELDS}        # field -> value -> value id
+
+
+    def __repr__(self):
+        return f"<PostTable, posts: {len(self.ids)}, {', '.join(f'{k}s: {len(v)}' for k, v in self.values.items())}>"
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, key):
+        """Whether a post, given as ``(board, post id)``, is in the table"""
+        return key in self.index
+
+
+    def intern(self, field, value):
+        """Id of a value of a field, assigning the next free id to new values"""
+        code = self._lookup[field].get(value)
+        if code is None:
+            code = self._lookup[field][value] = len(self.values[field])
+            self.values[field].append(value)
+        return code
+
+
+    def add(self, post):
+        """Add a post (a dict with ``id`` and the fields), returning its row
+
+        Posts are identified by board and id, so a post already in the
+        table isn't added again.
+        """
+
+        key = (post['board'], post['id'])
+        row = self.index.get(key)
+        if row is not None:
+            return row
+        row = self.index[key] = len(self.ids)
+        self.ids.append(post['id'])
+        self.isRe.append(post['isRe'])
+        for k in self.FIELDS:
+            self.codes[k].append(self.intern(k, post[k]))
+        return row
+
+
+    def record(self, row):
+        """Metadata of the post in a row, as a dict"""
+        rec = {'id': self.ids[row], 'isRe': self.isRe[row]}
+        for k in self.FIELDS:
+            rec[k] = self.values[k][self.codes[k][row]]
+        return rec
+
+
+    def save(self, path, rows=None):
+        """Write posts (all, or ``rows``) to a JSON lines file"""
+        with open(path, 'w') as f:
+            for row in range(len(self.ids)) if rows is None else rows:
+                f.write(json.dumps(self.record(row), ensure_ascii=False))
+                f.write('\n')
+
+    @classmethod
+    def load(cls, *paths):
+        """Read posts from files written by :py:meth:`.save`"""
+        table = cls()
+        for path in paths:
+            with open(path) as f:
+                for line in f:
+                    table.add(json.loads(line))
+        return table
 
 
 def segment(str):
@@ -0,0 +1,85 @@
+#%%
+import os
+import pickle
+
+try:
+    import fcntl
+except ImportError:     # Windows: no locking
+    fcntl = None
+
+
+class AuthorIndex():
+
+    def __init__(self, path=None, lock=False):
+        """Persistent author-to-id mapping
+
+        Ids are assigned on first sight and never change, so signed 
+        networks extracted in different runs (e.g., of different years) 
+        with the same index file share one id space.
+
+        Parameters
+        ----------
+        path : str, optional
+            Pickle file of the mapping. Loaded if it exists, and written
+            by :py:meth:`.save`. By default None (start empty, in memory only).
+        lock : bool, optional
+            Hold an exclusive lock on ``<path>.lock`` from loading until
+            :py:meth:`.close`, so that concurrent runs sharing the index
+            file don't assign the same ids to different authors. 
+            By default False.
+
+        Examples
+        --------
+        >>> with AuthorIndex('authors_Gossiping.pkl', lock=True) as authors:
+        ...     ids = [authors[a] for a in ['alice', 'bob']]
+        ...     authors.save()
+        """
+
+        self.path = path
+        self.idx = {}
+        self._lock = None
+        if path is not None and lock and fcntl is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._lock = open(path + '.lock', 'w')
+            fcntl.flock(self._lock, fcntl.LOCK_EX)
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.idx = pickle.load(f)
+
+    def __repr__(self):
+        return f"<AuthorIndex, authors: {len(self.idx)}>"
+
+    def __len__(self):
+        return len(self.idx)
+
+    def __contains__(self, author):
+        return author in self.idx
+
+    def __getitem__(self, author):
+        """Get the id of an author, assigning the next free id to new authors"""
+        idx = self.idx.get(author)
+        if idx is None:
+            idx = self.idx[author] = len(self.idx)
+        return idx
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def save(self, path=None):
+        """Write the mapping, replacing the file only once it is completely written"""
+        path = self.path if path is None else path
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self.idx, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        """Release the lock, if held"""
+        if self._lock is not None:
+            fcntl.flock(self._lock, fcntl.LOCK_UN)
+            self._lock.close()
+            self._lock = None
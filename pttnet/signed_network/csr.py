@@ -0,0 +1,158 @@
+#%%
+import numpy as np
+import networkx as nx
+from pttnet.utils import ord2iso
+
+
+class SignedCSR():
+
+    def __init__(self, src, dst, sign, date, num_nodes=None):
+        """Directed signed multigraph backed by CSR/CSC arrays
+
+        Every comment edge is one entry in four parallel columns. The
+        columns are sorted by ``(src, dst)`` so that the out-edges of a
+        node are a contiguous slice (CSR), and a second index sorted by
+        ``(dst, src)`` gives the in-edges of a node (CSC).
+
+        Parameters
+        ----------
+        src : array_like
+            Integer ids of the commenters (edge sources).
+        dst : array_like
+            Integer ids of the post authors (edge targets).
+        sign : array_like
+            Edge signs. 1: pos, 0: neu, -1: neg.
+        date : array_like
+            Edge dates as day ordinals (see :py:func:`datetime.date.toordinal`).
+        num_nodes : int, optional
+            Size of the node id space, by default ``max(src, dst) + 1``.
+
+        Notes
+        -----
+        Arrays kept in memory
+
+        .. code-block:: python
+
+            src, dst      # int32, edges sorted by (src, dst)
+            sign          # int8
+            date          # int32
+            edge_index    # int64, position of each edge in the input columns
+            indptr        # int64, out-edges of u: indptr[u]:indptr[u+1]
+            in_indptr     # int64, in-edges of v: in_eid[in_indptr[v]:in_indptr[v+1]]
+            in_eid        # int64, edge ids sorted by (dst, src)
+        """
+
+        src = np.asarray(src, dtype=np.int32)
+        dst = np.asarray(dst, dtype=np.int32)
+        if num_nodes is None:
+            num_nodes = int(max(src.max(), dst.max())) + 1 if len(src) else 0
+        self.n = num_nodes
+
+        # Out-edges (CSR)
+        order = np.lexsort((dst, src))
+        self.edge_index = order
+        self.src = src[order]
+        self.dst = dst[order]
+        self.sign = np.asarray(sign, dtype=np.int8)[order]
+        self.date = np.asarray(date, dtype=np.int32)[order]
+        self.indptr = self._indptr(self.src)
+
+        # In-edges (CSC)
+        self.in_eid = np.lexsort((self.src, self.dst))
+        self.in_indptr = self._indptr(self.dst)
+
+
+    def __repr__(self):
+        return f"<SignedCSR, nodes: {self.n}, edges: {self.number_of_edges()}>"
+
+    def _indptr(self, ids):
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ids, minlength=self.n), out=indptr[1:])
+        return indptr
+
+    @staticmethod
+    def _unique_sorted(a):
+        if len(a) == 0:
+            return a
+        keep = np.empty(len(a), dtype=bool)
+        keep[0] = True
+        np.not_equal(a[1:], a[:-1], out=keep[1:])
+        return a[keep]
+
+
+    @property
+    def nodes(self):
+        """Ids of nodes with at least one edge"""
+        return np.flatnonzero(self.out_degree() + self.in_degree())
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return len(self.src)
+
+    def out_degree(self):
+        """Number of out-edges (counting multi-edges) of every node"""
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        """Number of in-edges (counting multi-edges) of every node"""
+        return np.diff(self.in_indptr)
+
+    def out_edges(self, u):
+        """Edge ids of edges leaving ``u``"""
+        return np.arange(self.indptr[u], self.indptr[u + 1])
+
+    def in_edges(self, v):
+        """Edge ids of edges pointing to ``v``"""
+        return self.in_eid[self.in_indptr[v]:self.in_indptr[v + 1]]
+
+    def successors(self, u):
+        """Sorted, distinct out-neighbors of ``u``"""
+        return self._unique_sorted(self.dst[self.indptr[u]:self.indptr[u + 1]])
+
+    def predecessors(self, v):
+        """Sorted, distinct in-neighbors of ``v``"""
+        return self._unique_sorted(self.src[self.in_edges(v)])
+
+    def edge_ids(self, u, v):
+        """Edge ids of all (multi-)edges from ``u`` to ``v``"""
+        lo, hi = self.indptr[u], self.indptr[u + 1]
+        row = self.dst[lo:hi]
+        return np.arange(lo + np.searchsorted(row, v, 'left'), lo + np.searchsorted(row, v, 'right'))
+
+    def has_edge(self, u, v):
+        return len(self.edge_ids(u, v)) > 0
+
+
+    def to_networkx(self, nodes=None):
+        """Convert (a subgraph of) the graph to ``nx.MultiDiGraph``
+
+        Meant for small subgraphs, since every edge becomes a python
+        attribute dict again.
+
+        Parameters
+        ----------
+        nodes : iterable, optional
+            Node ids of the subgraph. Only edges with both ends in
+            ``nodes`` are kept. By default None (the whole graph).
+
+        Returns
+        -------
+        nx.MultiDiGraph
+            Same structure as :py:func:`pttnet.signed_network.graph.MultiDiGraph`
+            with the ``networkx`` backend.
+        """
+
+        G = nx.MultiDiGraph()
+        if nodes is None:
+            eids = np.arange(self.number_of_edges())
+        else:
+            nodes = np.fromiter(nodes, dtype=np.int64)
+            G.add_nodes_from(int(n) for n in nodes)
+            eids = np.flatnonzero(np.isin(self.src, nodes) & np.isin(self.dst, nodes))
+
+        for e in eids:
+            G.add_edge(int(self.src[e]), int(self.dst[e]), sign=int(self.sign[e]), date=ord2iso(self.date[e]))
+
+        return G
@@ -2,29 +2,76 @@
 import json
 import pickle
 import networkx as nx
-from os.path import join
+from array import array
+from os.path import join, isdir
+from pttnet.utils import iso2ord, ord2iso
+from pttnet.columnar import load_columns
+from pttnet.signed_network.csr import SignedCSR
 
 
-def MultiDiGraph(board="Gossiping", years=[2015], data_dir='data/signed_network/', load_node_mapping=False):
+def MultiDiGraph(board="Gossiping", years=[2015], data_dir='data/signed_network/', load_node_mapping=False, backend='networkx'):
+    """Load signed network data extracted by ``signed_network_extraction.py``
+
+    Parameters
+    ----------
+    board : str, optional
+        Board name, by default "Gossiping"
+    years : list, optional
+        Years the network was extracted from, by default [2015]
+    data_dir : str, optional
+        Path to the directory of the signed network data, 
+        by default 'data/signed_network/'
+    load_node_mapping : bool, optional
+        Also return the author-to-id mapping, by default False
+    backend : str, optional
+        ``'networkx'`` to load an ``nx.MultiDiGraph``, or ``'csr'`` to load
+        a :py:class:`.SignedCSR`, which stores edges in compact arrays and 
+        is meant for Gossiping-scale data. By default 'networkx'.
+
+    Returns
+    -------
+    nx.MultiDiGraph or SignedCSR
+        Edges point from commenter to post author, with attributes 
+        ``sign`` and ``date``.
+
+    Notes
+    -----
+    The binary edge table ``edges_<years>_<board>/`` is memory-mapped
+    when it exists. Otherwise the JSON lines file ``edges_<years>_<board>.jsonl``
+    written by older versions of ``signed_network_extraction.py`` is parsed.
+    """
     
     # Get file paths
     years = [str(y) for y in years]
+    edge_dir = join(data_dir, f'edges_{".".join(years)}_{board}')
     edge_file = join(data_dir , f'edges_{".".join(years)}_{board}.jsonl')
     node_file = join(data_dir, f'nodes_{".".join(years)}_{board}.pkl')
 
-    # Init Graph
-    G = nx.MultiDiGraph()
+    if backend == 'csr':
+        if isdir(edge_dir):
+            G = SignedCSR(*load_edge_table(edge_dir))
+        else:
+            G = SignedCSR(*load_edge_columns(edge_file))
+    elif backend == 'networkx':
+        # Init Graph
+        G = nx.MultiDiGraph()
 
-    # Load edges
-    with open(edge_file) as f:
-        for l in f:
-            edge = json.loads(l)
-            attr = {
-                'sign': sign(edge['sign']),
-                'date': edge['date']
-            }
+        # Load edges
+        if isdir(edge_dir):
+            for u, v, s, d in zip(*(c.tolist() for c in load_edge_table(edge_dir))):
+                G.add_edge(u, v, sign=s, date=ord2iso(d))
+        else:
+            with open(edge_file) as f:
+                for l in f:
+                    edge = json.loads(l)
+                    attr = {
+                        'sign': sign(edge['sign']),
+                        'date': edge['date']
+                    }
 
-            G.add_edge(edge['edge'][0], edge['edge'][1], **attr)
+                    G.add_edge(edge['edge'][0], edge['edge'][1], **attr)
+    else:
+        raise Exception(f"Unknown backend `{backend}`")
 
 
     if load_node_mapping:
@@ -39,6 +86,52 @@ def MultiDiGraph(board="Gossiping", years=[2015], data_dir='data/signed_network/
     return G
 
 
+def load_edge_table(edge_dir):
+    """Memory-map the binary edge table written by ``signed_network_extraction.py``
+
+    Parameters
+    ----------
+    edge_dir : str
+        Path to an ``edges_*`` directory.
+
+    Returns
+    -------
+    tuple
+        Arrays ``(src, dst, sign, date)``, with dates as day ordinals.
+    """
+
+    cols = load_columns(edge_dir, ['src', 'dst', 'sign', 'date'])
+    return cols['src'], cols['dst'], cols['sign'], cols['date']
+
+
+def load_edge_columns(edge_file):
+    """Read an edge file into compact columns
+
+    Parameters
+    ----------
+    edge_file : str
+        Path to an ``edges_*.jsonl`` file.
+
+    Returns
+    -------
+    tuple
+        Arrays ``(src, dst, sign, date)``, with dates as day ordinals.
+    """
+
+    src, dst = array('i'), array('i')
+    signs, dates = array('b'), array('i')
+
+    with open(edge_file) as f:
+        for l in f:
+            edge = json.loads(l)
+            src.append(edge['edge'][0])
+            dst.append(edge['edge'][1])
+            signs.append(sign(edge['sign']))
+            dates.append(iso2ord(edge['date']))
+    
+    return src, dst, signs, dates
+
+
 def sign(x):
     if x == 'neu':
         return 0
@@ -47,4 +140,4 @@ def sign(x):
     elif x == 'neg':
         return -1
     else:
-        raise Exception('Not `pos`, `neg` nor `neu` edge signs.')
\ No newline at end of file
+        raise Exception('Not `pos`, `neg` nor `neu` edge signs.')
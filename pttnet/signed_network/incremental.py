@@ -0,0 +1,121 @@
+#%%
+import pickle
+import numpy as np
+from pttnet.signed_network.status import edge_class, balance, FLIP
+
+
+class IncrementalStatus():
+
+    def __init__(self):
+        """Status configuration counts maintained over a time-ordered edge stream
+
+        Each new edge ``A -> B`` closes the triads with the common
+        neighbors ``X`` of ``A`` and ``B``, found by intersecting their
+        neighbor sets. The configurations it forms with the ``AX`` and
+        ``BX`` edges seen so far are added to a running contingency table,
+        which is the same as :py:func:`pttnet.signed_network.status.classify`
+        computed over all triads of the stream.
+
+        Edges of the same date never count as earlier than each other, so
+        the edges of the latest date are kept pending until a later date
+        arrives.
+
+        Examples
+        --------
+        >>> stats = IncrementalStatus()
+        >>> stats.update(G.src, G.dst, G.sign, G.date)   # e.g., a SignedCSR
+        >>> stats.save("status_checkpoint.pkl")
+        >>> # Later, with new data
+        >>> stats = IncrementalStatus.load("status_checkpoint.pkl")
+        >>> stats.update(src, dst, sign, date)
+        >>> stats.balance()
+        """
+
+        self.table = np.zeros((3, 6, 6), dtype=np.int64)
+        self.nbrs = {}                  # node -> set of neighbors (either direction)
+        self.pair_idx = {}              # (p, q), p < q -> row of `counts`
+        self.counts = np.zeros((1024, 6), dtype=np.int64)  # edge class counts of pairs, directions relative to p
+        self.pending = []               # edges (u, v, class) of `date`, not yet in the neighbor sets
+        self.date = None                # date (day ordinal) of the latest edges
+        self.edge_count = 0
+
+
+    def __repr__(self):
+        return f"<IncrementalStatus, edges: {self.edge_count}, nodes: {len(self.nbrs)}, pairs: {len(self.pair_idx)}>"
+
+
+    def update(self, src, dst, sign, date):
+        """Consume a batch of edges
+
+        Parameters
+        ----------
+        src, dst : array_like
+            Node ids of the edges.
+        sign : array_like
+            Edge signs. 1: pos, 0: neu, -1: neg.
+        date : array_like
+            Edge dates as day ordinals. Edges are processed in date order,
+            and must not be earlier than the edges already consumed.
+        """
+
+        src, dst = np.asarray(src), np.asarray(dst)
+        sign, date = np.asarray(sign), np.asarray(date)
+        order = np.argsort(date, kind='stable')
+        if len(order) and self.date is not None and date[order[0]] < self.date:
+            raise Exception("Edges earlier than the consumed edge stream")
+
+        for u, v, s, d in zip(src[order].tolist(), dst[order].tolist(), sign[order].tolist(), date[order].tolist()):
+            if u == v: continue
+            if d != self.date:
+                self._flush()
+                self.date = d
+
+            # Triads closed by u -> v
+            common = self.nbrs.get(u, set()) & self.nbrs.get(v, set())
+            if common:
+                cnt_AX = self._pairCounts(u, common)
+                cnt_BX = self._pairCounts(v, common)
+                self.table[s + 1] += cnt_AX.T @ cnt_BX
+
+            self.pending.append((u, v, int(edge_class(1, s))))
+            self.edge_count += 1
+
+
+    def _pairCounts(self, u, others):
+        """Edge class counts between ``u`` and each node of ``others``, relative to ``u``"""
+        rows = np.fromiter((self.pair_idx[(u, w) if u < w else (w, u)] for w in others), dtype=np.int64, count=len(others))
+        flip = np.fromiter((u > w for w in others), dtype=bool, count=len(others))
+        cnt = self.counts[rows]
+        return np.where(flip[:, None], cnt[:, FLIP], cnt)
+
+
+    def _flush(self):
+        """Add pending edges to the neighbor sets and pair counts"""
+        for u, v, cls in self.pending:
+            key = (u, v) if u < v else (v, u)
+            row = self.pair_idx.get(key)
+            if row is None:
+                row = self.pair_idx[key] = len(self.pair_idx)
+                if row == len(self.counts):
+                    self.counts = np.concatenate((self.counts, np.zeros_like(self.counts)))
+                self.nbrs.setdefault(u, set()).add(v)
+                self.nbrs.setdefault(v, set()).add(u)
+            self.counts[row, cls if u < v else FLIP[cls]] += 1
+        self.pending = []
+
+
+    def balance(self):
+        """Balance counts of the configurations so far, see :py:func:`pttnet.signed_network.status.balance`"""
+        return balance(self.table)
+
+
+    def save(self, path):
+        """Checkpoint the state to a pickle file"""
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Resume from a checkpoint written by :py:meth:`.save`"""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,180 @@
+#%%
+import numpy as np
+import networkx as nx
+from pttnet.utils import ord2iso
+
+
+# Positions of the nodes of the pairs AB, AX, BX in a triad (A, B, X)
+PAIR_NODES = np.array([[0, 1], [0, 2], [1, 2]])
+# Pair index of two node positions
+PAIR_ID = np.array([[-1, 0, 1], [0, -1, 2], [1, 2, -1]])
+# Edge class after swapping the two nodes of a pair
+FLIP = np.array([3, 4, 5, 0, 1, 2])
+SIGNS = ['neg', 'neu', 'pos']
+
+
+def edge_class(drct, sign):
+    """Edge class of a (direction, sign) pattern
+
+    ====  ==========  =========
+    cls   direction   sign
+    ====  ==========  =========
+    0     1           -1 (neg)
+    1     1           0 (neu)
+    2     1           1 (pos)
+    3     -1          -1 (neg)
+    4     -1          0 (neu)
+    5     -1          1 (pos)
+    ====  ==========  =========
+    """
+    return (np.asarray(drct) < 0) * 3 + np.asarray(sign) + 1
+
+
+def classify(offsets, drct, sign, date):
+    """Count the status configurations of a batch of triads
+
+    Every directed edge ``A -> B`` of a triad is taken as the ``AB`` edge in
+    turn (``X`` being the third node). Each combination of an ``AX`` and a
+    ``BX`` edge formed before ``AB`` is one configuration.
+
+    Parameters
+    ----------
+    offsets : array_like
+        Ragged offsets of the triad edges, of length ``3 * k + 1`` for ``k``
+        triads. Edges of pair ``p`` (0: AB, 1: AX, 2: BX) of triad ``t`` are
+        ``offsets[3 * t + p]:offsets[3 * t + p + 1]``.
+    drct : array_like
+        Edge directions, relative to the canonical order of the pair's nodes
+        (e.g., 1: A to X, -1: X to A for pair AX).
+    sign : array_like
+        Edge signs. 1: pos, 0: neu, -1: neg.
+    date : array_like
+        Edge dates as day ordinals.
+
+    Returns
+    -------
+    np.ndarray
+        Contingency table of shape ``(3, 6, 6)``, indexed by ``AB`` sign
+        (``sign + 1``), ``AX`` class and ``BX`` class (see
+        :py:func:`.edge_class`). Directions of ``AX`` and ``BX`` are
+        relative to ``A`` and ``B``.
+    """
+
+    offsets = np.asarray(offsets, dtype=np.int64)
+    drct = np.asarray(drct, dtype=np.int64)
+    sign = np.asarray(sign, dtype=np.int64)
+    date = np.asarray(date, dtype=np.int64)
+    table = np.zeros((3, 6, 6), dtype=np.int64)
+    if len(date) == 0:
+        return table
+
+    seg = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    triad, pair = seg // 3, seg % 3
+
+    # Sorted (pair segment, edge class, date) keys, for counting edges
+    # of a class formed before a date by binary search
+    keys = np.sort(((seg * 6 + edge_class(drct, sign)) << 20) | date)
+
+    def earlier(segs, flip, before):
+        base = (segs[:, None] * 6 + np.arange(6)) << 20
+        cnt = np.searchsorted(keys, base | before[:, None]) - np.searchsorted(keys, base)
+        return np.where(flip[:, None], cnt[:, FLIP], cnt)
+
+    # Roles of every edge as the `AB` edge
+    lo, hi = PAIR_NODES[pair].T
+    a = np.where(drct > 0, lo, hi)
+    b = np.where(drct > 0, hi, lo)
+    x = 3 - a - b
+    cnt_AX = earlier(triad * 3 + PAIR_ID[a, x], a > x, date)
+    cnt_BX = earlier(triad * 3 + PAIR_ID[b, x], b > x, date)
+
+    for s in range(3):
+        m = sign + 1 == s
+        table[s] = cnt_AX[m].T @ cnt_BX[m]
+
+    return table
+
+
+def balance(table):
+    """Count balanced and unbalanced configurations in a contingency table
+
+    Parameters
+    ----------
+    table : np.ndarray
+        Table returned by :py:func:`.classify`.
+
+    Returns
+    -------
+    dict
+        Counts of ``balanced`` (positive sign product), ``unbalanced``
+        (negative sign product) and ``neutral`` (any neutral edge)
+        configurations, regardless of directions.
+    """
+
+    s = np.arange(6) % 3 - 1
+    product = (np.arange(3) - 1)[:, None, None] * s[None, :, None] * s[None, None, :]
+    return {
+        'balanced': int(table[product > 0].sum()),
+        'unbalanced': int(table[product < 0].sum()),
+        'neutral': int(table[product == 0].sum()),
+    }
+
+
+def table_records(table):
+    """Flatten a contingency table into a list of readable records"""
+
+    return [
+        {
+            'AB': SIGNS[s],
+            'AX_drct': 1 if c1 < 3 else -1,
+            'AX': SIGNS[c1 % 3],
+            'BX_drct': 1 if c2 < 3 else -1,
+            'BX': SIGNS[c2 % 3],
+            'count': int(table[s, c1, c2])
+        } for s in range(3) for c1 in range(6) for c2 in range(6)
+    ]
+
+
+def triad_gml(nodes, offsets, drct, sign, date):
+    """Generate the configurations of one triad as GML strings
+
+    Parameters
+    ----------
+    nodes : tuple
+        Node ids ``(A, B, X)``.
+    offsets : array_like
+        Edge offsets of the pairs AB, AX and BX (length 4).
+    drct, sign, date : array_like
+        Edge data, see :py:func:`.classify`.
+
+    Yields
+    ------
+    str
+        A GML ``nx.DiGraph`` with the ``AB``, ``AX`` and ``BX`` edges of one
+        configuration, with ``AB`` formed last.
+    """
+
+    nodes = [int(n) for n in nodes]
+
+    # Edges by pair, with directions for each order of the pair's nodes
+    edges = {}
+    for p, (i, j) in enumerate(PAIR_NODES.tolist()):
+        e = [(int(d), int(s), int(t)) for d, s, t in zip(*(c[offsets[p]:offsets[p + 1]] for c in (drct, sign, date)))]
+        edges[(i, j)] = e
+        edges[(j, i)] = [(-d, s, t) for d, s, t in e]
+
+    for a, b in ((0, 1), (1, 0), (0, 2), (2, 0), (1, 2), (2, 1)):
+        x = 3 - a - b
+        A, B, X = nodes[a], nodes[b], nodes[x]
+        for d_AB, s_AB, t_AB in edges[(a, b)]:
+            if d_AB != 1: continue
+            for d_AX, s_AX, t_AX in edges[(a, x)]:
+                if t_AX >= t_AB: continue
+                for d_BX, s_BX, t_BX in edges[(b, x)]:
+                    if t_BX >= t_AB: continue
+
+                    G = nx.DiGraph()
+                    G.add_edge(A, B, sign=s_AB, date=ord2iso(t_AB))
+                    G.add_edge(*((A, X) if d_AX == 1 else (X, A)), sign=s_AX, date=ord2iso(t_AX))
+                    G.add_edge(*((B, X) if d_BX == 1 else (X, B)), sign=s_BX, date=ord2iso(t_BX))
+                    yield ''.join(nx.generate_gml(G))
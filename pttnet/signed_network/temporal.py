@@ -0,0 +1,133 @@
+#%%
+import numpy as np
+import networkx as nx
+from pttnet.utils import iso2ord, ord2iso
+from pttnet.signed_network.graph import MultiDiGraph
+
+
+class SlidingWindows():
+
+    def __init__(self, board="Gossiping", years=[2015], data_dir='data/signed_network/', G=None, window=30, stride=1, start=None, end=None):
+        """Snapshots of a signed network in sliding time windows
+
+        The edge stream is loaded and sorted by date once. Consecutive
+        snapshots are then derived from each other by adding the edges
+        entering the window and removing those expiring, so the work per
+        window is proportional to the change, not to the window size.
+
+        Parameters
+        ----------
+        board : str, optional
+            Board name, by default "Gossiping"
+        years : list, optional
+            Years of the network, by default [2015]
+        data_dir : str, optional
+            Path to the directory of the signed network data,
+            by default 'data/signed_network/'
+        G : SignedCSR, optional
+            Graph to start from. If specified, ``board``, ``years`` and
+            ``data_dir`` are ignored. By default None.
+        window : int, optional
+            Window length in days, by default 30
+        stride : int, optional
+            Days between the starts of consecutive windows, by default 1
+        start : str, optional
+            Start date of the first window in isoformat, by default the
+            date of the earliest edge.
+        end : str, optional
+            Last date (inclusive) covered by the windows in isoformat, by
+            default the date of the latest edge.
+
+        Examples
+        --------
+        Monthly windows, moving one week at a time:
+
+        >>> windows = SlidingWindows(board="Gossiping", years=[2015], window=30, stride=7)
+        >>> for start, end, G in windows:
+        ...     print(start, end, G.number_of_edges())
+        """
+
+        if G is None:
+            G = MultiDiGraph(board=board, years=years, data_dir=data_dir, backend='csr')
+        self.G = G
+        self.window = window
+        self.stride = stride
+
+        # Edges in date order
+        self.order = np.argsort(G.date, kind='stable')
+        self.dates = G.date[self.order]
+
+        if len(self.dates) == 0:
+            self.start = self.end = 0
+        else:
+            self.start = int(self.dates[0]) if start is None else iso2ord(start)
+            self.end = int(self.dates[-1]) if end is None else iso2ord(end)
+
+
+    def __repr__(self):
+        return f"<SlidingWindows, {ord2iso(self.start)} to {ord2iso(self.end)}, window: {self.window} days, stride: {self.stride} days>"
+
+    def __len__(self):
+        return len(self.ranges())
+
+    def __iter__(self):
+        """Generate snapshots as a ``nx.MultiDiGraph``
+
+        Yields
+        ------
+        str
+            First date of the window in isoformat.
+        str
+            Last date of the window in isoformat.
+        nx.MultiDiGraph
+            Edges in the window, keyed by edge id, with attributes
+            ``sign`` and ``date``. The same graph object is updated in
+            place between windows: copy it to keep a snapshot.
+        """
+
+        G, S = self.G, nx.MultiDiGraph()
+        for start, end, entering, leaving in self.deltas():
+            for e in leaving.tolist():
+                u, v = int(G.src[e]), int(G.dst[e])
+                S.remove_edge(u, v, key=e)
+                for n in (u, v):
+                    if n in S and S.degree(n) == 0:
+                        S.remove_node(n)
+
+            for e, u, v, s, d in zip(entering.tolist(), G.src[entering].tolist(), G.dst[entering].tolist(), G.sign[entering].tolist(), G.date[entering].tolist()):
+                S.add_edge(u, v, key=e, sign=s, date=ord2iso(d))
+
+            yield start, end, S
+
+
+    def ranges(self):
+        """Ranges ``(lo, hi)`` of the date-sorted edges in each window"""
+
+        starts = np.arange(self.start, self.end + 1, self.stride)
+        los = np.searchsorted(self.dates, starts, 'left')
+        his = np.searchsorted(self.dates, np.minimum(starts + self.window, self.end + 1), 'left')
+        return list(zip(starts.tolist(), los.tolist(), his.tolist()))
+
+
+    def deltas(self):
+        """Generate the edges entering and leaving each window
+
+        Yields
+        ------
+        str
+            First date of the window in isoformat.
+        str
+            Last date of the window in isoformat.
+        np.ndarray
+            Ids of the edges entering the window.
+        np.ndarray
+            Ids of the edges of the previous window expiring.
+        """
+
+        prev_lo = prev_hi = 0
+        for start, lo, hi in self.ranges():
+            leaving = self.order[prev_lo:max(prev_lo, min(lo, prev_hi))]
+            entering = self.order[max(lo, prev_hi):hi]
+            end = min(start + self.window - 1, self.end)
+            yield ord2iso(start), ord2iso(end), entering, leaving
+            prev_lo, prev_hi = lo, hi
@@ -1,11 +1,382 @@
 #%%
-
 import os
-import sys
-import json
+import multiprocessing as mp
+import numpy as np
+from pttnet.utils import ord2iso
+from pttnet.columnar import NpyWriter, load_columns
+from pttnet.signed_network.graph import MultiDiGraph
+
+
+class Triangles():
+
+    def __init__(self, board="HatePolitics", years=[2015], data_dir='data/signed_network/', G=None, batch_size=1 << 22, n_jobs=1):
+        """Enumerate the triangles (triads) of a signed network
+
+        Every set of three nodes that are pairwise connected (in either
+        direction) is emitted exactly once, in canonical orientation
+        ``A < B < X`` (node ids).
+
+        Parameters
+        ----------
+        board : str, optional
+            Board name, by default "HatePolitics"
+        years : list, optional
+            Years of the network, by default [2015]
+        data_dir : str, optional
+            Path to the directory of the signed network data,
+            by default 'data/signed_network/'
+        G : SignedCSR, optional
+            Graph to start from. If specified, ``board``, ``years`` and
+            ``data_dir`` are ignored. By default None (load with
+            :py:func:`pttnet.signed_network.graph.MultiDiGraph`).
+        batch_size : int, optional
+            Maximum number of wedges checked at once, which bounds the
+            memory used in enumeration, by default 1 << 22
+        n_jobs : int, optional
+            Number of worker processes. ``-1`` uses all CPUs. Results are
+            identical to (and in the same order as) the serial run. 
+            By default 1.
+
+        Notes
+        -----
+        The multigraph is first reduced to a simple undirected graph.
+        Each undirected edge is then oriented from the endpoint of lower
+        degree to the one of higher degree (ties broken by id), so that
+        every node has at most ``O(sqrt(E))`` out-neighbors. A triangle is
+        found once, from its lowest ranked node ``u``: for every
+        out-neighbor ``v`` of ``u``, the out-neighbors ``w`` of ``v`` are
+        looked up in the sorted adjacency of ``u`` by binary search.
+
+        In parallel mode, anchor nodes are split into contiguous chunks of
+        about equal wedge count, several per worker. Workers get the graph
+        arrays through ``fork`` (read-only, not copied) where available, and
+        chunk outputs are merged in anchor order.
+
+        Examples
+        --------
+        >>> T = Triangles(board="HatePolitics", years=[2015], n_jobs=-1)
+        >>> T.count()
+        >>> for A, B, X in T:
+        ...     pass
+        >>> for tri, offsets, drct, sign, date in T.triad_arrays():  # with edge data
+        ...     pass
+        """
+
+        if G is None:
+            G = MultiDiGraph(board=board, years=years, data_dir=data_dir, backend='csr')
+        self.G = G
+        self.batch_size = batch_size
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        self._edge_keys = None
+        self._orient()
+
+
+    def __repr__(self):
+        return f"<Triangles, nodes: {self.G.n}, undirected edges: {len(self.keys)}>"
+
+    def __iter__(self):
+        for tri in self.arrays():
+            yield from map(tuple, tri.tolist())
+
+
+    def _orient(self):
+        n = self.G.n
+        src = self.G.src.astype(np.int64)
+        dst = self.G.dst.astype(np.int64)
+
+        # Simple undirected graph without self-loops
+        lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+        pairs = np.unique((lo * n + hi)[lo != hi])
+        lo, hi = pairs // n, pairs % n
+
+        # Degree ordering
+        deg = np.bincount(lo, minlength=n) + np.bincount(hi, minlength=n)
+        rank = np.empty(n, dtype=np.int64)
+        rank[np.lexsort((np.arange(n), deg))] = np.arange(n)
+
+        # Orient edges from lower to higher rank, sorted by (x, y)
+        fwd = rank[lo] < rank[hi]
+        x, y = np.where(fwd, lo, hi), np.where(fwd, hi, lo)
+        self.keys = np.sort(x * n + y)
+        self.indices = self.keys % n
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(x, minlength=n), out=self.indptr[1:])
+
+        # Number of wedges to check for each anchor node
+        outdeg = np.diff(self.indptr)
+        self.work = np.bincount(x, weights=outdeg[y], minlength=n).astype(np.int64)
+
+
+    def batches(self, anchors=None, size=None):
+        """Split anchor nodes into contiguous ranges of bounded work
+
+        Parameters
+        ----------
+        anchors : tuple, optional
+            Range ``(start, stop)`` of anchor node ids, by default None
+            (all nodes).
+        size : int, optional
+            Maximum number of wedges in a batch, by default ``batch_size``
+
+        Returns
+        -------
+        list
+            ``(start, stop)`` ranges of anchor node ids. An anchor with
+            more than ``size`` wedges is a batch of its own.
+        """
+
+        size = self.batch_size if size is None else size
+        start, stop = (0, self.G.n) if anchors is None else anchors
+        cum = np.cumsum(self.work[start:stop])
+
+        out = []
+        i, done = 0, 0
+        while i < len(cum):
+            j = max(i + 1, int(np.searchsorted(cum, done + size, 'right')))
+            out.append((start + i, start + j))
+            i, done = j, cum[j - 1]
+        return out
+
+
+    def enumerate(self, start, stop):
+        """Triangles anchored at nodes ``start`` to ``stop - 1``
+
+        Returns
+        -------
+        np.ndarray
+            Shape ``(k, 3)``, one triangle ``(A, B, X)`` with ``A < B < X``
+            per row.
+        """
+
+        n = self.G.n
+        lo, hi = self.indptr[start], self.indptr[stop]
+        if lo == hi:
+            return np.empty((0, 3), dtype=np.int32)
+
+        # Oriented edges u -> v of the anchors
+        u = np.repeat(np.arange(start, stop), np.diff(self.indptr[start:stop + 1]))
+        v = self.indices[lo:hi]
+
+        # Wedges u -> v -> w
+        starts = self.indptr[v]
+        lens = self.indptr[v + 1] - starts
+        rep = np.repeat(np.arange(len(v)), lens)
+        offs = np.arange(len(rep)) + np.repeat(starts - (np.cumsum(lens) - lens), lens)
+        w = self.indices[offs]
+        u, v = u[rep], v[rep]
+
+        # Closed wedges: w in the sorted adjacency of u
+        k = u * n + w
+        pos = np.searchsorted(self.keys, k)
+        pos[pos == len(self.keys)] = 0
+        closed = self.keys[pos] == k
+
+        tri = np.stack((u[closed], v[closed], w[closed]), axis=1)
+        tri.sort(axis=1)
+        return tri.astype(np.int32)
+
+
+    def arrays(self):
+        """Generate triangles in batches
+
+        Yields
+        ------
+        np.ndarray
+            Shape ``(k, 3)`` arrays, see :py:meth:`.enumerate`.
+        """
+
+        if self.n_jobs <= 1:
+            for start, stop in self.batches():
+                yield self.enumerate(start, stop)
+            return
+
+        # Degree-balanced chunks, several per worker
+        size = max(1, min(self.batch_size, int(self.work.sum()) // (4 * self.n_jobs)))
+        ctx = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else None)
+        with ctx.Pool(self.n_jobs, initializer=_init_worker, initargs=(self,)) as pool:
+            yield from pool.imap(_enumerate, self.batches(size=size))
+
+
+    def count(self):
+        return sum(len(tri) for tri in self.arrays())
+
+
+    def edges(self, tri):
+        """Edges of a batch of triangles, as ragged arrays
+
+        Parameters
+        ----------
+        tri : np.ndarray
+            Triangles ``(A, B, X)`` with ``A < B < X``, shape ``(k, 3)``.
+
+        Returns
+        -------
+        tuple
+            ``(offsets, drct, sign, date)``. Edges of pair ``p``
+            (0: AB, 1: AX, 2: BX) of the ``t``-th triangle are
+            ``offsets[3 * t + p]:offsets[3 * t + p + 1]``, with directions
+            1 from the lower to the higher node id (e.g., A to X) and -1
+            otherwise. See :py:func:`pttnet.signed_network.status.classify`.
+        """
+
+        G = self.G
+        if self._edge_keys is None:
+            self._edge_keys = G.src.astype(np.int64) * G.n + G.dst
+        keys = self._edge_keys
+
+        # Node pairs (p, q), p < q: AB, AX, BX of every triangle
+        tri = np.asarray(tri, dtype=np.int64)
+        p = tri[:, [0, 0, 1]].ravel()
+        q = tri[:, [1, 2, 2]].ravel()
+
+        # Edge id ranges of p -> q, then q -> p
+        pq, qp = p * G.n + q, q * G.n + p
+        starts = np.stack((np.searchsorted(keys, pq), np.searchsorted(keys, qp)), axis=1).ravel()
+        stops = np.stack((np.searchsorted(keys, pq, 'right'), np.searchsorted(keys, qp, 'right')), axis=1).ravel()
+        lens = stops - starts
+        eids = np.arange(lens.sum()) + np.repeat(starts - (np.cumsum(lens) - lens), lens)
+
+        offsets = np.zeros(len(p) + 1, dtype=np.int64)
+        np.cumsum(lens.reshape(-1, 2).sum(axis=1), out=offsets[1:])
+        drct = np.repeat(np.tile(np.array([1, -1], dtype=np.int8), len(p)), lens)
+
+        return offsets, drct, G.sign[eids], G.date[eids]
+
+
+    def triad_arrays(self):
+        """Generate triangles in batches, with the data of their edges
+
+        Yields
+        ------
+        tuple
+            ``(tri, offsets, drct, sign, date)``, see :py:meth:`.edges`.
+        """
+
+        for tri in self.arrays():
+            yield (tri,) + self.edges(tri)
+
+
+    def triads(self):
+        """Generate triangles with the data of their edges
+
+        Yields
+        ------
+        str
+            Triad key ``A_B_X``, with ``A < B < X``.
+        dict
+            Edges of the pairs ``AB``, ``AX`` and ``BX``.
+
+        Notes
+        -----
+        Triad structure
+
+        .. code-block:: python
+
+            {
+              "AB": {
+                'drct': [],       # 1: A to B, -1: B to A
+                'sign': [],       # 1: pos, 0: neu, -1: neg
+                'date': []
+              },
+              "AX": {...},        # 1: A to X, -1: X to A
+              "BX": {...}         # 1: B to X, -1: X to B
+            }
+        """
+
+        for tri, offsets, drct, sign, date in self.triad_arrays():
+            offsets, drct, sign, date = offsets.tolist(), drct.tolist(), sign.tolist(), date.tolist()
+            for t, (A, B, X) in enumerate(tri.tolist()):
+                c_type = {}
+                for p, name in enumerate(('AB', 'AX', 'BX')):
+                    lo, hi = offsets[3 * t + p], offsets[3 * t + p + 1]
+                    c_type[name] = {
+                        'drct': drct[lo:hi],
+                        'sign': sign[lo:hi],
+                        'date': [ord2iso(d) for d in date[lo:hi]]
+                    }
+                yield f'{A}_{B}_{X}', c_type
+
+
+class TriadWriter():
+
+    def __init__(self, dir_):
+        """Write triads as a compact, typed column table
+
+        Parameters
+        ----------
+        dir_ : str
+            Output directory, created if it doesn't exist.
+
+        Notes
+        -----
+        Files written (all ``.npy``)
+
+        .. code-block:: python
+
+            nodes      # int32, shape (k, 3): A < B < X of each triad
+            offsets    # int64, shape (3k + 1,): ragged edge offsets of the pairs AB, AX, BX
+            drct       # int8, edge directions (1: lower to higher node id)
+            sign       # int8, 1: pos, 0: neu, -1: neg
+            date       # int32, day ordinals
+        """
+
+        os.makedirs(dir_, exist_ok=True)
+        self.nodes = NpyWriter(os.path.join(dir_, 'nodes.npy'), 'i4', (3,))
+        self.offsets = NpyWriter(os.path.join(dir_, 'offsets.npy'), 'i8')
+        self.cols = [NpyWriter(os.path.join(dir_, f'{c}.npy'), dt) for c, dt in (('drct', 'i1'), ('sign', 'i1'), ('date', 'i4'))]
+        self.offsets.write([0])
+        self.edge_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, tri, offsets, drct, sign, date):
+        """Append a batch of triads, as yielded by :py:meth:`.Triangles.triad_arrays`"""
+        self.nodes.write(tri)
+        self.offsets.write(np.asarray(offsets[1:]) + self.edge_count)
+        for w, c in zip(self.cols, (drct, sign, date)):
+            w.write(c)
+        self.edge_count += int(offsets[-1])
+
+    def close(self):
+        for w in [self.nodes, self.offsets] + self.cols:
+            w.close()
+
+
+def read_triads(dir_, batch_size=100000):
+    """Stream triads written by :py:class:`.TriadWriter`
+
+    Parameters
+    ----------
+    dir_ : str
+        Directory of the triad table.
+    batch_size : int, optional
+        Number of triads per batch, by default 100000
+
+    Yields
+    ------
+    tuple
+        ``(tri, offsets, drct, sign, date)`` arrays of a batch, with 
+        ``offsets`` starting at 0. See :py:meth:`.Triangles.edges`.
+    """
+
+    cols = load_columns(dir_, ['nodes', 'offsets', 'drct', 'sign', 'date'])
+    for t0 in range(0, len(cols['nodes']), batch_size):
+        t1 = min(t0 + batch_size, len(cols['nodes']))
+        offsets = np.array(cols['offsets'][3 * t0:3 * t1 + 1])
+        lo, hi = offsets[0], offsets[-1]
+        yield (np.array(cols['nodes'][t0:t1]), offsets - lo, 
+               np.array(cols['drct'][lo:hi]), np.array(cols['sign'][lo:hi]), np.array(cols['date'][lo:hi]))
 
+# Triangles object shared with worker processes
+_triangles = None
 
-def Triangles(board="HatePolitics", years=[2015], data_dir='data/signed_network/'):
-    years = [str(y) for y in years]
+def _init_worker(T):
+    global _triangles
+    _triangles = T
 
-    with 
+def _enumerate(batch):
+    return _triangles.enumerate(*batch)
@@ -0,0 +1,509 @@
+import os
+import re
+import json
+import shutil
+import pickle
+import logging
+import itertools
+import numpy as np
+from pttnet import preprocess
+from pttnet import graph
+from pttnet.metrics import Metrics
+from pttnet.columnar import ColumnWriter
+
+
+# Word segmenter, loaded once per process (see :py:func:`.segment`)
+_WS = {}
+
+
+def segment(board, year, basedir='data/corpus/', outdir='data/corpus/segmented/', ckip_data='../ckiptagger/data', word_list='data/word_list/all', disable_cuda=True, metrics=None):
+    """Segment the posts and comments of a board and year with CKIP Tagger
+
+    Requires ``ckiptagger``. Segmented posts are saved with the same file
+    names under ``outdir``, with words separated by ``\\u3000``.
+
+    Parameters
+    ----------
+    board : str
+        Board name
+    year : str
+        Year
+    basedir : str, optional
+        Corpus directory, by default 'data/corpus/'
+    outdir : str, optional
+        Segmented corpus directory, by default 'data/corpus/segmented/'
+    ckip_data : str, optional
+        CKIP Tagger model directory, by default '../ckiptagger/data'
+    word_list : str, optional
+        Custom dictionary, one word per line, by default 'data/word_list/all'
+    disable_cuda : bool, optional
+        Passed to ``ckiptagger.WS``, by default True (run on CPU)
+    metrics : Metrics, optional
+        Metrics of the run, by default None
+    """
+
+    from ckiptagger import construct_dictionary, WS
+    metrics = Metrics(f'segment_{board}_{year}') if metrics is None else metrics
+
+    if (ckip_data, disable_cuda) not in _WS:
+        _WS[ckip_data, disable_cuda] = WS(ckip_data, disable_cuda=disable_cuda)
+    ws = _WS[ckip_data, disable_cuda]
+
+    # Check arguments
+    if board not in os.listdir(basedir):
+        raise Exception(f"{board} doesn't exist!" )
+    if str(year) not in os.listdir(os.path.join(basedir, board)):
+        raise Exception(f"{os.path.join(basedir, board, str(year))} doesn't exist!")
+
+    # Set up segmenter
+    with open(word_list) as f:
+        user_dict = construct_dictionary({line.strip(): 1 for line in f})  # Load custom recommend dict
+
+    year_folder_outpath = os.path.join(outdir, board, str(year))
+    os.makedirs(year_folder_outpath, exist_ok=True)
+
+    # Segment posts in a year
+    year_folder_inpath = os.path.join(basedir, board, str(year))
+    with metrics.stage(f'segment_{year}'):
+        for post in os.listdir(year_folder_inpath):
+
+            # Load a new post from json
+            with open(os.path.join(year_folder_inpath, post)) as f:
+                data = json.load(f)
+
+            # Segment post body and comments
+            data['post_body'] = ckipseg(ws, data['post_body'], user_dict)
+            for i, cmt in enumerate(data['comments']):
+                data['comments'][i]['content'] = ckipseg(ws, cmt['content'], user_dict)
+
+            # Save result to new json
+            with open(os.path.join(year_folder_outpath, post), "w") as f:
+                json.dump(data, f, ensure_ascii=False)
+            metrics.count('posts')
+            metrics.count('comments', len(data['comments']))
+
+
+def ckipseg(ws, text, user_dict=None):
+    text = [sent.strip() for sent in text.split('\n') if sent != '']
+
+    # Split sentence
+    if user_dict:
+        word_sentence_list = ws(text, recommend_dictionary = user_dict)
+    else:
+        word_sentence_list = ws(text)
+
+    pat = re.compile(r'\s+')
+    out_str = ''
+    sent_num = len(word_sentence_list)
+    for i, sent in enumerate(word_sentence_list):
+        if len(sent) == 0: continue
+        out_str += '\u3000'.join(w for w in sent if w != '' and pat.match(w) is None)
+
+        if i != sent_num - 1:
+            out_str += '\n'
+
+    return out_str
+
+
+def _check_corpus(board, years, basedir):
+    if board not in os.listdir(basedir):
+        raise Exception(f"{board} doesn't exist!" )
+    for y in years:
+        if str(y) not in os.listdir(os.path.join(basedir, board)):
+            raise Exception(f"{os.path.join(basedir, board, str(y))} doesn't exist!")
+
+
+def comment2edges(board, years, basedir='data/corpus/', edge_dir='data/network/edges', metrics=None):
+    """Write the co-comment edges of a board's posts, one file per year
+
+    Every pair of comments (by different authors) in a post is an edge,
+    saved to ``<edge_dir>/<board>_<year>_edges.jsonl`` by the year of the
+    post's date. Edges only carry the post id (``text``), the date and 
+    the opinion; the titles, tags and boards of the posts are saved once
+    per post to ``<edge_dir>/<board>_<year>_posts.jsonl`` (see 
+    :py:class:`pttnet.preprocess.PostTable`). Existing files of ``years`` 
+    are replaced.
+
+    Parameters
+    ----------
+    board : str
+        Board name
+    years : list
+        Years of the corpus
+    basedir : str, optional
+        Corpus directory, by default 'data/corpus/'
+    edge_dir : str, optional
+        Output directory, by default 'data/network/edges'
+    metrics : Metrics, optional
+        Metrics of the run, by default None
+    """
+
+    metrics = Metrics(f"comment2edges_{board}_{'.'.join(years)}") if metrics is None else metrics
+
+    _check_corpus(board, years, basedir)
+
+    # Clean up
+    for year in years:
+        for out_file in (edge_file(edge_dir, board, year), post_file(edge_dir, board, year)):
+            if os.path.exists(out_file): os.remove(out_file)
+    os.makedirs(edge_dir, exist_ok=True)
+
+    # Read post data
+    table = preprocess.PostTable()
+    with metrics.stage('load'):
+        posts = preprocess.load_comments_data_from_corpus(boards=[board], years=years, basedir=basedir, table=table)
+        post_num = len(posts)
+        metrics.count('posts', post_num)
+
+    # Construct network data from post comments
+    with metrics.stage('edges'):
+        for i, post in enumerate(posts):
+            metrics.count('posts')
+            metrics.count('comments', len(post['comments']))
+
+            # Determine outfile from post year
+            year = post['date'][:4]
+            with open(post_file(edge_dir, board, year), "a") as f:
+                f.write(json.dumps(table.record(post['post']), ensure_ascii=False))
+                f.write('\n')
+
+            with open(edge_file(edge_dir, board, year), "a") as f:
+
+                # Get edges in a post
+                edge_count = 0
+                for cmt1, cmt2 in itertools.combinations(post['comments'], r=2):
+
+                    # Avoid self-loops
+                    if cmt1['author'] == cmt2['author']: continue
+
+                    edge = {
+                        'edge': (cmt1['author'], cmt2['author']),
+                        'attr': {
+                            'date': post['date'],
+                            'opinion': f"{cmt1['type']}-{cmt2['type']}",
+                            'text': post['id'],
+                        }
+                    }
+
+                    # Save edge data
+                    f.write(json.dumps(edge, ensure_ascii=False))
+                    f.write('\n')
+                    edge_count += 1
+
+            metrics.count('edges', edge_count)
+
+            # Show progress
+            if i % max(int(post_num/20), 1) == 0: logging.info(f"Progressed: {i/post_num:.2%}")
+
+
+def edge_file(edge_dir, board, year):
+    return os.path.join(edge_dir, f'{board}_{year}_edges.jsonl')
+
+def post_file(edge_dir, board, year):
+    return os.path.join(edge_dir, f'{board}_{year}_posts.jsonl')
+
+
+def node_pairs(node_dir):
+    """``(board, year)`` pairs whose comments are in the node files of ``node_dir``"""
+
+    fp = os.path.join(node_dir, graph.NODE_MANIFEST)
+    if not os.path.exists(fp):
+        return set()
+    with open(fp) as f:
+        return {tuple(p) for p in json.load(f)['pairs']}
+
+
+def comment2nodes(board, years, basedir='data/corpus/', node_dir='data/network/nodes', metrics=None):
+    """Add the comments of a board's posts to the node files of their authors
+
+    Comments are appended to the node files in ``node_dir``, so running
+    this twice for the same board and year duplicates their comments.
+    The boards and years added are recorded in the manifest of 
+    ``node_dir`` (see :py:func:`.node_pairs`).
+
+    Parameters
+    ----------
+    board : str
+        Board name
+    years : list
+        Years of the corpus
+    basedir : str, optional
+        Corpus directory, by default 'data/corpus/'
+    node_dir : str, optional
+        Output directory, by default 'data/network/nodes'
+    metrics : Metrics, optional
+        Metrics of the run, by default None
+    """
+
+    metrics = Metrics(f"comment2nodes_{board}_{'.'.join(years)}") if metrics is None else metrics
+    _check_corpus(board, years, basedir)
+    os.makedirs(node_dir, exist_ok=True)
+
+    # Read post data
+    with metrics.stage('load'):
+        posts = preprocess.load_comments_data_from_corpus(boards=[board], years=years, basedir=basedir)
+        post_num = len(posts)
+        metrics.count('posts', post_num)
+
+    # Construct network data from post comments
+    with metrics.stage('nodes'):
+        all_nodes = {}
+        for i, post in enumerate(posts):
+            metrics.count('posts')
+            metrics.count('comments', len(post['comments']))
+
+            # Get nodes in a post
+            for cmt in post['comments']:
+
+                # Create new node
+                if cmt['author'] not in all_nodes.keys():
+                    all_nodes[cmt['author']] = graph.Node(id_=cmt['author'])
+
+                # Add comments
+                comment = {
+                    'date': post['date'],
+                    'board': post['board'],
+                    'content': cmt['content'],
+                    'src': post['id'] ,
+                    'type_': cmt['type'],
+                    'ord_': cmt['order']
+                }
+                all_nodes[cmt['author']].add_comment(**comment)
+
+            # Show progress / save nodes to disk
+            if i % max(int(post_num/20), 1) == 0 or i == post_num - 1:
+                logging.info(f"Progressed: {(i+1)/post_num:.2%}")
+
+                # Write node data to disk
+                for id_, node in all_nodes.items():
+                    node._saveNode(dir_=node_dir)
+                metrics.count('node_writes', len(all_nodes))
+
+                # Clean up (release memory)
+                del all_nodes
+                all_nodes = {}
+
+    # Record the comments added
+    fp = os.path.join(node_dir, graph.NODE_MANIFEST)
+    pairs = sorted(node_pairs(node_dir) | {(board, str(y)) for y in years})
+    with open(fp + '.tmp', 'w') as f:
+        json.dump({'pairs': pairs}, f, ensure_ascii=False)
+    os.replace(fp + '.tmp', fp)
+
+
+def signed_network_extraction(board, years, basedir='data/corpus/', data_dir='data/signed_network/', metrics=None):
+    """Extract the signed commenter -> post author network of a board
+
+    Writes the binary edge table ``edges_<years>_<board>/`` and the
+    author ids ``nodes_<years>_<board>.pkl`` to ``data_dir``. Author ids
+    come from ``authors_<board>.pkl``, which is shared by all years of
+    the board, so runs of the same board must not overlap.
+
+    Parameters
+    ----------
+    board : str
+        Board name
+    years : list
+        Years of the corpus
+    basedir : str, optional
+        Corpus directory, by default 'data/corpus/'
+    data_dir : str, optional
+        Output directory, by default 'data/signed_network/'
+    metrics : Metrics, optional
+        Metrics of the run, by default None
+    """
+
+    from pttnet.signed_network.graph import sign
+    from pttnet.signed_network.authors import AuthorIndex
+
+    metrics = Metrics(f"signed_network_extraction_{'.'.join(years)}_{board}") if metrics is None else metrics
+    output_edge_data = os.path.join(data_dir, f"edges_{'.'.join(years)}_{board}")
+    output_node_data = os.path.join(data_dir, f"nodes_{'.'.join(years)}_{board}.pkl")
+    author_index = os.path.join(data_dir, f"authors_{board}.pkl")   # Shared by all years
+
+    # Stream post data
+    _check_corpus(board, years, basedir)
+    posts = preprocess.iter_comments_data_from_corpus(boards=[board], years=years, basedir=basedir)
+
+    # Clean up
+    if os.path.exists(output_edge_data):
+        shutil.rmtree(output_edge_data)
+    if os.path.exists(output_node_data):
+        os.remove(output_node_data)
+
+    logging.info(f"Start extracting networks...")
+
+    #-------------- Extract network --------------#
+    # Authors get ids on first sight, from the index shared across years
+    # (locked until saved, since concurrent runs of a board share it)
+    with AuthorIndex(author_index, lock=True) as authors:
+        auth_idx = {}
+
+        def author_id(author):
+            idx = auth_idx.get(author)
+            if idx is None:
+                idx = auth_idx[author] = authors[author]
+            return idx
+
+        # Binary edge table: one `.npy` file per column
+        columns = {
+            'src': 'i',     # commenter id
+            'dst': 'i',     # post author id
+            'sign': 'b',    # 1: pos, 0: neu, -1: neg
+            'date': 'i',    # day ordinal
+            'post': 'i',    # line number in `posts.txt`
+            'ord': 'i',     # comment order in post
+        }
+        post_ids = []
+        with metrics.stage('extract'), ColumnWriter(output_edge_data, columns) as edges:
+            for post in posts:
+                metrics.count('posts')
+                metrics.count('comments', len(post['comments']))
+                if len(post['comments']) == 0: continue
+
+                # Authors of deleted posts are empty
+                post_author = post['author']
+                if post_author != '':
+                    dst = author_id(post_author)
+
+                post_idx = None
+                date = post['day']
+                edge_count = 0
+
+                for cmt in post['comments']:
+                    if cmt['author'] == '': continue
+                    src = author_id(cmt['author'])
+
+                    # Avoid self loops
+                    if post_author == '' or cmt['author'] == post_author: continue
+
+                    if post_idx is None:
+                        post_idx = len(post_ids)
+                        post_ids.append(post['id'])
+
+                    # Save edge data
+                    edges.append((src, dst, sign(cmt['type']), date, post_idx, cmt['order']))
+                    edge_count += 1
+
+                metrics.count('edges', edge_count)
+
+        with metrics.stage('save'):
+            with open(os.path.join(output_edge_data, 'posts.txt'), 'w') as f:
+                f.writelines(id_ + '\n' for id_ in post_ids)
+
+            # Save node data
+            authors.save()
+            with open(output_node_data, 'wb') as f:
+                pickle.dump(auth_idx, f)
+            metrics.count('nodes', len(auth_idx))
+
+
+def theory_of_status(board, years, data_dir='data/signed_network/', n_jobs=1, metrics=None):
+    """Enumerate the triads of a board's signed network
+
+    Each triad A_B_X (A < B < X) is written once to
+    ``triangles_<years>_<board>/``, with the edges of all three pairs.
+    Any pair can then be taken as the ``AB`` edge in analyses.
+
+    Parameters
+    ----------
+    board : str
+        Board name
+    years : list
+        Years of the signed network
+    data_dir : str, optional
+        Directory of the signed network, by default 'data/signed_network/'
+    n_jobs : int, optional
+        Number of processes, see :py:class:`pttnet.signed_network.triangles.Triangles`.
+        By default 1
+    metrics : Metrics, optional
+        Metrics of the run, by default None
+    """
+
+    from pttnet.signed_network.triangles import Triangles, TriadWriter
+
+    metrics = Metrics(f"theory_of_status_{'.'.join(years)}_{board}") if metrics is None else metrics
+    output_dir = os.path.join(data_dir, f'triangles_{".".join(years)}_{board}')
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+
+    # Load Graph data
+    with metrics.stage('load'):
+        T = Triangles(board=board, years=years, data_dir=data_dir, n_jobs=n_jobs)
+        metrics.count('nodes', T.G.number_of_nodes())
+        metrics.count('edges', T.G.number_of_edges())
+    logging.info(f"Loaded graph: {T}")
+
+    with metrics.stage('triads'), TriadWriter(output_dir) as writer:
+        for triads in T.triad_arrays():
+            writer.write(*triads)
+            metrics.count('triads', len(triads[0]))
+
+
+def status_triangles(board, years, data_dir='data/signed_network/', gml_sample=0, batch_size=100000, seed=0, metrics=None):
+    """Classify the triads of a board into status configurations
+
+    Reads the triads written by :py:func:`.theory_of_status` and saves
+    the configuration counts and balance to
+    ``triangles_<years>_<board>_status.json``.
+
+    Parameters
+    ----------
+    board : str
+        Board name
+    years : list
+        Years of the signed network
+    data_dir : str, optional
+        Directory of the signed network, by default 'data/signed_network/'
+    gml_sample : int, optional
+        Number of triads randomly sampled for GML export to
+        ``triangles_<years>_<board>_processed.gmll`` (0: no export).
+        By default 0
+    batch_size : int, optional
+        Number of triads classified at once, by default 100000
+    seed : int, optional
+        Random seed of the GML sample, by default 0
+    metrics : Metrics, optional
+        Metrics of the run, by default None
+    """
+
+    from pttnet.signed_network.triangles import read_triads
+    from pttnet.signed_network.status import classify, balance, table_records, triad_gml
+
+    metrics = Metrics(f"preprocess_status_triangles_{'.'.join(years)}_{board}") if metrics is None else metrics
+    triangles_dir = os.path.join(data_dir, f'triangles_{".".join(years)}_{board}')
+    status_output_file = triangles_dir + '_status.json'
+    gml_output_file = triangles_dir + '_processed.gmll'
+
+    rng = np.random.default_rng(seed)
+    table = np.zeros((3, 6, 6), dtype=np.int64)
+    triad_count = 0
+    sample = []   # (priority, triad data) of triads sampled for GML export
+
+    with metrics.stage('classify'):
+        for nodes, offsets, drct, sign, date in read_triads(triangles_dir, batch_size):
+            table += classify(offsets, drct, sign, date)
+            triad_count += len(nodes)
+            metrics.count('triads', len(nodes))
+
+            # Keep the triads with the lowest random priorities
+            if gml_sample > 0:
+                priority = rng.random(len(nodes))
+                for t in np.argsort(priority)[:gml_sample]:
+                    lo, hi = offsets[3 * t], offsets[3 * t + 3]
+                    sample.append((priority[t], tuple(nodes[t]), offsets[3 * t:3 * t + 4] - lo, drct[lo:hi], sign[lo:hi], date[lo:hi]))
+                sample = sorted(sample, key=lambda x: x[0])[:gml_sample]
+
+    with open(status_output_file, "w") as f:
+        json.dump({
+            'triads': triad_count,
+            'balance': balance(table),
+            'configurations': table_records(table),
+        }, f, ensure_ascii=False, indent=1)
+
+    if gml_sample > 0:
+        with open(gml_output_file, "w") as f:
+            for _, *triad in sample:
+                for G_s in triad_gml(*triad):
+                    f.write(G_s)
+                    f.write('\n')
@@ -1,4 +1,6 @@
-from functools import reduce
+import bisect
+import datetime
+from functools import reduce, lru_cache
 
 def merge_dicts(dicts):
     """
@@ -17,4 +19,63 @@ def merge_2dicts(d1, d2):
         else:
             merged[k] = d2[k]
         
-    return merged
\ No newline at end of file
+    return merged
+
+@lru_cache(maxsize=None)
+def iso2ord(date):
+    """
+    Convert an isoformat date string to its (memoized) day ordinal
+    """
+
+    return datetime.date.fromisoformat(date).toordinal()
+
+@lru_cache(maxsize=None)
+def ord2iso(ordinal):
+    """
+    Convert a day ordinal back to its (memoized) isoformat date string
+    """
+
+    return datetime.date.fromordinal(int(ordinal)).isoformat()
+
+
+class DayCache():
+
+    def __init__(self):
+        """Local day ordinals of Unix timestamps, converted once per day
+
+        ``datetime.fromtimestamp`` is costly compared to the rest of the
+        work per post. Since all timestamps of a (local) day map to the
+        same ordinal, the bounds of each day seen are kept and later
+        timestamps falling within them are looked up instead.
+
+        Days are in local time, as with ``datetime.fromtimestamp``.
+
+        Examples
+        --------
+        >>> to_day = DayCache()
+        >>> ord2iso(to_day(1420113600))    # 2015-01-01 12:00 UTC
+        '2015-01-01'
+        """
+
+        self.starts = []    # sorted timestamps of the local midnights seen
+        self.days = []      # (start, end, ordinal) of each day, same order
+        self._last = (0, 0, None)
+
+    def __call__(self, timestamp):
+        start, end, ordinal = self._last
+        if start <= timestamp < end:
+            return ordinal
+
+        i = bisect.bisect_right(self.starts, timestamp) - 1
+        if i >= 0 and timestamp < self.days[i][1]:
+            self._last = self.days[i]
+            return self._last[2]
+
+        date = datetime.datetime.fromtimestamp(timestamp).date()
+        start = datetime.datetime.combine(date, datetime.time()).timestamp()
+        end = datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time()).timestamp()
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.days.insert(i, (start, end, date.toordinal()))
+        self._last = self.days[i]
+        return self._last[2]
@@ -5,9 +5,12 @@ import setuptools
 
 packages = [
     "pttnet",
+    "pttnet.signed_network",
 ]
 install_requires=[
-    "networkx>=2.4.0"
+    "networkx>=2.4.0",
+    "numpy",
+    "scipy"
 ]
 
 setuptools.setup(
@@ -21,6 +24,9 @@ setuptools.setup(
     url="https://github.com/liao961120/ptt-network",
     packages=packages,
     install_requires=install_requires,
+    entry_points={
+        "console_scripts": ["pttnet=pttnet.cli:main"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,49 @@
+import itertools
+import numpy as np
+import pytest
+from pttnet.signed_network.csr import SignedCSR
+
+
+@pytest.fixture(params=[0, 1])
+def signed_graph(request):
+    """Small random signed multigraph, with multi-edges, self-loops and repeated dates"""
+
+    rng = np.random.default_rng(request.param)
+    n, m = 40, 400
+    src = rng.integers(0, n, m)
+    dst = np.where(rng.random(m) < 0.7, rng.integers(0, n // 2, m), rng.integers(0, n, m))
+    sign = rng.integers(-1, 2, m)
+    date = 735600 + rng.integers(0, 15, m)
+    return SignedCSR(src, dst, sign, date)
+
+
+@pytest.fixture
+def brute_triads(signed_graph):
+    """Triangles ``(A, B, X)``, ``A < B < X``, found by checking every triple of nodes"""
+
+    G = signed_graph
+    linked = {(min(u, v), max(u, v)) for u, v in zip(G.src.tolist(), G.dst.tolist()) if u != v}
+    return {
+        (a, b, x) for a, b, x in itertools.combinations(range(G.n), 3)
+        if (a, b) in linked and (a, x) in linked and (b, x) in linked
+    }
+
+
+@pytest.fixture
+def brute_status(signed_graph, brute_triads):
+    """Status contingency table, from every pair of earlier edges of every edge of a triad"""
+
+    G = signed_graph
+    edges = list(zip(G.src.tolist(), G.dst.tolist(), G.sign.tolist(), G.date.tolist()))
+    table = np.zeros((3, 6, 6), dtype=np.int64)
+    for tri in brute_triads:
+        tri_edges = [e for e in edges if e[0] in tri and e[1] in tri and e[0] != e[1]]
+        for a, b, s, d in tri_edges:
+            x, = set(tri) - {a, b}
+            # Earlier edges between a (or b) and x, with direction relative to a (or b)
+            AX = [(1 if u == a else -1, s_) for u, v, s_, d_ in tri_edges if {u, v} == {a, x} and d_ < d]
+            BX = [(1 if u == b else -1, s_) for u, v, s_, d_ in tri_edges if {u, v} == {b, x} and d_ < d]
+            for d1, s1 in AX:
+                for d2, s2 in BX:
+                    table[s + 1, (d1 < 0) * 3 + s1 + 1, (d2 < 0) * 3 + s2 + 1] += 1
+    return table
@@ -0,0 +1,79 @@
+import networkx as nx
+import numpy as np
+import pytest
+from pttnet import analytics
+
+
+@pytest.fixture
+def weighted_graph():
+    G = nx.gnm_random_graph(60, 250, seed=1)
+    rng = np.random.default_rng(1)
+    for u, v in G.edges:
+        G[u][v]['weight'] = int(rng.integers(1, 6))
+    G.add_edge(3, 3, weight=2)
+    G.add_node('isolated')
+    return G
+
+
+def as_array(G, values):
+    return np.array([values[n] for n in G])
+
+
+def test_degree(weighted_graph):
+    G = weighted_graph
+    A, nodes = analytics.adjacency(G)
+    assert nodes == list(G)
+    assert analytics.degree(A).tolist() == [d for _, d in G.degree]
+    assert np.allclose(analytics.degree(A, weighted=True), [d for _, d in G.degree(weight='weight')])
+
+
+def test_pagerank(weighted_graph):
+    G = weighted_graph
+    A, _ = analytics.adjacency(G)
+    assert np.allclose(analytics.pagerank(A), as_array(G, nx.pagerank(G)), atol=1e-6)
+
+    D = nx.gnm_random_graph(50, 200, seed=2, directed=True)
+    A, _ = analytics.adjacency(D)
+    assert np.allclose(analytics.pagerank(A), as_array(D, nx.pagerank(D)), atol=1e-6)
+
+
+def test_pagerank_rejects_negative_weights():
+    with pytest.raises(ValueError):
+        analytics.pagerank(np.array([[0, -1], [1, 0]]))
+
+
+def test_triangles_and_clustering(weighted_graph):
+    G = weighted_graph
+    A, _ = analytics.adjacency(G)
+    assert analytics.triangles(A).tolist() == as_array(G, nx.triangles(G)).tolist()
+    assert np.allclose(analytics.clustering(A), as_array(G, nx.clustering(G)))
+    assert np.allclose(analytics.clustering(A, weighted=True), as_array(G, nx.clustering(G, weight='weight')))
+
+
+def test_directed_structure_is_symmetrized():
+    D = nx.DiGraph([(0, 1), (1, 2), (2, 0), (2, 3)])
+    A, _ = analytics.adjacency(D)
+    U = D.to_undirected()
+    assert analytics.triangles(A).tolist() == as_array(U, nx.triangles(U)).tolist()
+    assert np.allclose(analytics.clustering(A), as_array(U, nx.clustering(U)))
+
+
+def test_signed_edges_keep_structure():
+    # Opposite signs sum to 0 but still link the nodes
+    M = nx.MultiDiGraph()
+    M.add_edges_from([(0, 1, {'sign': 1}), (0, 1, {'sign': -1}), (1, 2, {'sign': 1}), (2, 0, {'sign': -1})])
+    A, _ = analytics.adjacency(M, weight='sign')
+    assert analytics.triangles(A).tolist() == [1, 1, 1]
+    assert analytics.clustering(A).tolist() == [1.0, 1.0, 1.0]
+
+
+def test_node_metrics(weighted_graph):
+    G = weighted_graph
+    metrics = analytics.node_metrics(G)
+    assert metrics['degree'].tolist() == [d for _, d in G.degree]
+    assert np.allclose(metrics['weighted_degree'], [d for _, d in G.degree(weight='weight')])
+    assert np.allclose(metrics['pagerank'], as_array(G, nx.pagerank(G)), atol=1e-6)
+    assert G.nodes[0]['clustering'] == pytest.approx(nx.clustering(G, 0))
+
+    M = nx.MultiDiGraph([(0, 1), (0, 1), (1, 2), (2, 1), (2, 0)])
+    assert analytics.node_metrics(M, weight=None, set_attributes=False)['degree'].tolist() == [d for _, d in M.degree]
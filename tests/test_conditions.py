@@ -0,0 +1,63 @@
+import datetime
+import numpy as np
+import pytest
+from pttnet.utils import iso2ord, ord2iso
+from pttnet.conditions import EdgeCondition
+
+FIRST = iso2ord('2015-01-01')
+OPINIONS = ['pos-pos', 'pos-neg', 'neg-neg', 'neu-pos']
+
+
+@pytest.fixture
+def edges():
+    rng = np.random.default_rng(0)
+    return [
+        (f'u{rng.integers(20)}', f'u{rng.integers(20)}', {'date': ord2iso(FIRST + int(rng.integers(40))), 'opinion': OPINIONS[rng.integers(4)]})
+        for _ in range(500)
+    ]
+
+
+def naive(condition, start, end, u, v, attr):
+    """The condition checked key by key on the raw dict"""
+    for k, values in (condition or {}).items():
+        if k == 'nodes':
+            if u not in values and v not in values: return False
+        elif k == 'date':
+            if attr['date'] not in {str(d) for d in values}: return False
+        elif attr[k] not in values:
+            return False
+    if start is not None and attr['date'] < str(start): return False
+    if end is not None and attr['date'] > str(end): return False
+    return True
+
+
+CASES = [
+    (None, None, None),
+    ({'opinion': ['pos-pos', 'neg-neg']}, None, None),
+    ({'date': [ord2iso(FIRST + d) for d in range(5, 12)]}, None, None),
+    ({'date': [ord2iso(FIRST + d) for d in (3, 4, 9, 30)]}, None, None),
+    ({'date': [datetime.date.fromordinal(FIRST + d) for d in (3, 4, 9, 30)]}, '2015-01-05', None),
+    ({'date': [ord2iso(FIRST + d) for d in range(5, 12)]}, '2015-01-08', '2015-01-20'),
+    ({'nodes': {'u1', 'u2', 'u3'}, 'opinion': {'pos-neg'}}, None, '2015-01-20'),
+    ({}, '2015-01-10', '2015-01-19'),
+    ({}, datetime.date(2015, 1, 10), None),
+    ({}, '2015-02-01', '2015-01-01'),
+]
+
+
+@pytest.mark.parametrize('condition, start, end', CASES)
+def test_call_matches_naive(edges, condition, start, end):
+    cond = EdgeCondition(condition, start, end)
+    assert [cond(u, v, a) for u, v, a in edges] == [naive(condition, start, end, u, v, a) for u, v, a in edges]
+
+
+@pytest.mark.parametrize('condition, start, end', CASES)
+def test_mask_matches_naive(edges, condition, start, end):
+    cond = EdgeCondition(condition, start, end)
+    columns = {
+        'src': np.array([u for u, _, _ in edges]),
+        'dst': np.array([v for _, v, _ in edges]),
+        'date': np.array([iso2ord(a['date']) for _, _, a in edges]),
+        'opinion': np.array([a['opinion'] for _, _, a in edges]),
+    }
+    assert cond.mask(columns).tolist() == [naive(condition, start, end, u, v, a) for u, v, a in edges]
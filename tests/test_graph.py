@@ -0,0 +1,103 @@
+import json
+import os
+from collections import Counter
+import numpy as np
+import pytest
+from pttnet.utils import iso2ord, ord2iso
+from pttnet.graph import MultiGraph, Graph, edge_date_index
+
+FILES = {('Gossiping', 2014): '2014-12-20', ('Gossiping', 2015): '2015-01-01', ('HatePolitics', 2015): '2015-01-01'}
+
+
+@pytest.fixture
+def network(tmp_path):
+    """Edge and node files of a few boards and years, with the edges of a post written together
+
+    Edges have the date of their post, so dates are not sorted but stay
+    within the year of the file.
+    """
+
+    rng = np.random.default_rng(0)
+    edge_path, node_path = tmp_path / 'edges', tmp_path / 'nodes'
+    edge_path.mkdir()
+    node_path.mkdir()
+
+    users = [f'u{i}' for i in range(15)]
+    for (board, year), first in FILES.items():
+        with open(edge_path / f'{board}_{year}_edges.jsonl', 'w') as f:
+            for p in range(60):
+                # Posts are roughly, not strictly, in date order
+                date = iso2ord(first) + p // 3 + int(rng.integers(-2, 3))
+                date = ord2iso(min(max(date, iso2ord(f'{year}-01-01')), iso2ord(f'{year}-12-31')))
+                for _ in range(rng.integers(1, 5)):
+                    u, v = rng.choice(users, 2, replace=False)
+                    attr = {'date': date, 'opinion': str(rng.choice(['pos-pos', 'neg-neg', 'pos-neu'])), 'text': f'{board}_{p}'}
+                    f.write(json.dumps({'edge': [str(u), str(v)], 'attr': attr}) + '\n')
+
+    for u in users:
+        with open(node_path / f'{u}-stats.json', 'w') as f:
+            json.dump({'id': u, 'corpus_stats': {}, 'vocab': {}}, f)
+        open(node_path / f'{u}-corp.jsonl', 'w').close()
+
+    return {'edge_path': str(edge_path), 'node_path': str(node_path)}
+
+
+def edge_counts(G):
+    return Counter((*sorted((u.id, v.id)), a['date'], a['opinion'], a['text']) for u, v, a in G.edges(data=True))
+
+
+def scan(network, boards, years, keep):
+    """Edges of a full load, filtered afterwards"""
+    G = MultiGraph(boards=boards, years=years, **network)
+    return Counter({e: c for e, c in edge_counts(G).items() if keep(e[2])})
+
+
+QUERIES = [
+    ({}, '2015-01-05', '2015-01-12'),
+    ({}, '2014-12-25', '2015-01-03'),
+    ({}, None, '2014-12-31'),
+    ({}, '2015-01-15', None),
+    ({'date': ['2015-01-02', '2015-01-07', '2015-01-08', '2015-01-20']}, None, None),
+    ({'date': ['2015-01-02', '2015-01-07', '2015-01-08', '2015-01-20'], 'opinion': ['pos-pos']}, '2015-01-05', None),
+]
+
+
+@pytest.mark.parametrize('condition, start, end', QUERIES)
+def test_date_index_matches_full_scan(network, condition, start, end):
+    def keep(date):
+        return ((start is None or date >= start) and (end is None or date <= end)
+                and date in condition.get('date', [date]))
+
+    expected = scan(network, 'all', 'all', keep)
+    if 'opinion' in condition:
+        expected = Counter({e: c for e, c in expected.items() if e[3] in condition['opinion']})
+
+    for _ in range(2):   # Index built, then read from the sidecar
+        MG = MultiGraph(condition, boards='all', years='all', start=start, end=end, **network)
+        assert edge_counts(MG) == expected
+    assert sum(expected.values()) > 0
+
+
+def test_board_set_and_graph_weights(network):
+    start, end = '2015-01-03', '2015-01-10'
+    MG = MultiGraph(boards=['HatePolitics'], years=[2015], start=start, end=end, **network)
+    expected = scan(network, ['HatePolitics'], [2015], lambda d: start <= d <= end)
+    assert edge_counts(MG) == expected
+
+    G = Graph({'opinion': ['pos-pos', 'neg-neg']}, boards=['HatePolitics'], years=[2015], start=start, end=end, **network)
+    weights = Counter()
+    for (u, v, date, opinion, text), c in expected.items():
+        if opinion in ('pos-pos', 'neg-neg'):
+            weights[u, v] += c
+    assert {tuple(sorted((u.id, v.id))): a['weight'] for u, v, a in G.edges(data=True)} == weights
+
+
+def test_date_index_runs(network):
+    fp = os.path.join(network['edge_path'], 'Gossiping_2015_edges.jsonl')
+    with open(fp, 'rb') as f:
+        data = f.read()
+    runs = edge_date_index(fp)
+    assert runs[0][1] == 0 and runs[-1][2] == len(data)
+    for (date, start, end), nxt in zip(runs, runs[1:] + [None]):
+        assert nxt is None or (nxt[1] == end and nxt[0] != date)
+        assert all(iso2ord(json.loads(l)['attr']['date']) == date for l in data[start:end].splitlines())
@@ -0,0 +1,35 @@
+import pytest
+import numpy as np
+from pttnet.signed_network.incremental import IncrementalStatus
+from pttnet.signed_network.status import balance
+
+
+def test_incremental_matches_brute_force(signed_graph, brute_status):
+    G = signed_graph
+    stats = IncrementalStatus()
+    stats.update(G.src, G.dst, G.sign, G.date)
+    assert np.array_equal(stats.table, brute_status)
+    assert stats.balance() == balance(brute_status)
+
+
+def test_batches_and_checkpoint(signed_graph, brute_status, tmp_path):
+    G = signed_graph
+    order = np.argsort(G.date, kind='stable')
+    src, dst, sign, date = (c[order] for c in (G.src, G.dst, G.sign, G.date))
+
+    # Batches split within days, with a checkpoint in between
+    stats = IncrementalStatus()
+    bounds = [0, 37, 150, 151, 290, len(date)]
+    for i, (lo, hi) in enumerate(zip(bounds, bounds[1:])):
+        if i == 2:
+            stats.save(tmp_path / 'status.pkl')
+            stats = IncrementalStatus.load(tmp_path / 'status.pkl')
+        stats.update(src[lo:hi], dst[lo:hi], sign[lo:hi], date[lo:hi])
+    assert np.array_equal(stats.table, brute_status)
+
+
+def test_rejects_earlier_edges():
+    stats = IncrementalStatus()
+    stats.update([0], [1], [1], [735610])
+    with pytest.raises(Exception):
+        stats.update([1], [2], [1], [735609])
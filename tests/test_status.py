@@ -0,0 +1,29 @@
+import numpy as np
+from pttnet.signed_network.triangles import Triangles
+from pttnet.signed_network.status import classify, balance, triad_gml
+
+
+def test_classify_matches_brute_force(signed_graph, brute_status):
+    table = np.zeros((3, 6, 6), dtype=np.int64)
+    for tri, offsets, drct, sign, date in Triangles(G=signed_graph, batch_size=50).triad_arrays():
+        table += classify(offsets, drct, sign, date)
+    assert brute_status.sum() > 0
+    assert np.array_equal(table, brute_status)
+
+
+def test_classify_counts_triad_gml_configurations(signed_graph):
+    for tri, offsets, drct, sign, date in Triangles(G=signed_graph).triad_arrays():
+        for t in range(min(len(tri), 20)):
+            lo, hi = offsets[3 * t], offsets[3 * t + 3]
+            o = offsets[3 * t:3 * t + 4] - lo
+            table = classify(o, drct[lo:hi], sign[lo:hi], date[lo:hi])
+            assert table.sum() == sum(1 for _ in triad_gml(tri[t], o, drct[lo:hi], sign[lo:hi], date[lo:hi]))
+
+
+def test_balance():
+    table = np.zeros((3, 6, 6), dtype=np.int64)
+    table[2, 2, 5] = 1     # pos, pos, pos
+    table[0, 0, 2] = 2     # neg, neg, pos
+    table[0, 2, 2] = 3     # neg, pos, pos
+    table[1, 2, 2] = 4     # neu
+    assert balance(table) == {'balanced': 3, 'unbalanced': 3, 'neutral': 4}
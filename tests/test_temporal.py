@@ -0,0 +1,35 @@
+import pytest
+from pttnet.utils import iso2ord, ord2iso
+from pttnet.signed_network.temporal import SlidingWindows
+
+
+def window_edges(G, first, last):
+    return {
+        (u, v, e, s, ord2iso(d))
+        for e, (u, v, s, d) in enumerate(zip(G.src.tolist(), G.dst.tolist(), G.sign.tolist(), G.date.tolist()))
+        if first <= d <= last
+    }
+
+
+@pytest.mark.parametrize('window, stride', [(1, 1), (4, 1), (3, 5), (30, 2)])
+def test_windows_match_filtered_edges(signed_graph, window, stride):
+    G = signed_graph
+    windows = SlidingWindows(G=G, window=window, stride=stride)
+    first, last = int(G.date.min()), int(G.date.max())
+
+    starts = list(range(first, last + 1, stride))
+    assert len(windows) == len(starts)
+    for s, (start, end, S) in zip(starts, windows):
+        assert (start, end) == (ord2iso(s), ord2iso(min(s + window - 1, last)))
+        expected = window_edges(G, s, min(s + window - 1, last))
+        assert {(u, v, e, a['sign'], a['date']) for u, v, e, a in S.edges(keys=True, data=True)} == expected
+        assert set(S) == {n for u, v, *_ in expected for n in (u, v)}
+
+
+def test_start_and_end(signed_graph):
+    G = signed_graph
+    first = int(G.date.min())
+    windows = SlidingWindows(G=G, window=3, stride=2, start=ord2iso(first + 2), end=ord2iso(first + 8))
+    for start, end, S in windows:
+        assert {(u, v, e, a['sign'], a['date']) for u, v, e, a in S.edges(keys=True, data=True)} == window_edges(G, iso2ord(start), iso2ord(end))
+    assert end == ord2iso(first + 8)
@@ -0,0 +1,36 @@
+import numpy as np
+from pttnet.utils import iso2ord
+from pttnet.signed_network.triangles import Triangles
+
+
+def test_triangles_match_brute_force(signed_graph, brute_triads):
+    T = Triangles(G=signed_graph)
+    found = list(T)
+    assert len(found) == len(set(found)) == T.count()
+    assert brute_triads and set(found) == brute_triads
+
+
+def test_small_batches_match_one_batch(signed_graph):
+    full = np.concatenate(list(Triangles(G=signed_graph).arrays()))
+    batched = np.concatenate(list(Triangles(G=signed_graph, batch_size=7).arrays()))
+    assert np.array_equal(full, batched)
+
+
+def test_triad_edges(signed_graph):
+    G = signed_graph
+    for key, c_type in Triangles(G=G).triads():
+        A, B, X = map(int, key.split('_'))
+        for name, (p, q) in zip(('AB', 'AX', 'BX'), ((A, B), (A, X), (B, X))):
+            expected = sorted(
+                [(1, int(G.sign[e]), int(G.date[e])) for e in G.edge_ids(p, q)] +
+                [(-1, int(G.sign[e]), int(G.date[e])) for e in G.edge_ids(q, p)]
+            )
+            edges = c_type[name]
+            assert sorted(zip(edges['drct'], edges['sign'], map(iso2ord, edges['date']))) == expected
+
+
+def test_parallel_matches_serial(signed_graph, brute_triads):
+    serial = np.concatenate(list(Triangles(G=signed_graph).arrays()))
+    parallel = np.concatenate(list(Triangles(G=signed_graph, n_jobs=3).arrays()))
+    assert np.array_equal(serial, parallel)
+    assert set(map(tuple, parallel.tolist())) == brute_triads